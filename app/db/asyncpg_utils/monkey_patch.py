@@ -1,3 +1,5 @@
+from uuid import uuid4
+
 from sqlalchemy.dialects.postgresql.asyncpg import (
     AsyncAdapt_asyncpg_connection,
 )
@@ -32,3 +34,23 @@ def _handle_exception(self, error):
 
 
 AsyncAdapt_asyncpg_connection._handle_exception = _handle_exception  # noqa
+
+
+_cached_prepare = AsyncAdapt_asyncpg_connection._prepare  # noqa
+
+
+async def _prepare(self, operation, invalidate_timestamp):
+    if self._prepared_statement_cache is not None:
+        return await _cached_prepare(self, operation, invalidate_timestamp)
+
+    # Без кэша (режим PgBouncer): asyncpg называет запросы счетчиком
+    # соединения, и на общем серверном соединении имена разных клиентов
+    # совпадают. Уникальное имя исключает "prepared statement already exists"
+    await self._check_type_cache_invalidation(invalidate_timestamp)
+    prepared_stmt = await self._connection.prepare(
+        operation, name=f"__asyncpg_{uuid4().hex}__"
+    )
+    return prepared_stmt, prepared_stmt.get_attributes()
+
+
+AsyncAdapt_asyncpg_connection._prepare = _prepare  # noqa
@@ -4,25 +4,37 @@ from contextlib import asynccontextmanager
 from typing import Any
 from typing import AsyncContextManager
 from typing import List
+from typing import Mapping
 from typing import Optional
+from typing import Sequence
 from typing import Type
 from typing import TypeVar
 from typing import Union
 from typing import cast
 from uuid import UUID
+from uuid import uuid4
 
+from sqlalchemy import column
 from sqlalchemy import delete
 from sqlalchemy import exists
 from sqlalchemy import func
+from sqlalchemy import inspect
 from sqlalchemy import lambda_stmt
 from sqlalchemy import select
+from sqlalchemy import table
+from sqlalchemy import text
 from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.engine import Result
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.asyncio import AsyncSessionTransaction
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.sql import Executable
 
+from app.db.decorators import read_replica
+from app.db.routing import mark_written
+from app.utils.pagination import Page
+
 Model = TypeVar("Model")
 TransactionContext = AsyncContextManager[AsyncSessionTransaction]
 
@@ -39,12 +51,20 @@ class BaseCRUD(ABC):
 
         if isinstance(db_session, sessionmaker):
             self.session: AsyncSession = cast(AsyncSession, db_session())
+            self.managed = False
         else:
+            # Сессией владеет вызывающая сторона (unit of work запроса):
+            # фиксация и откат выполняются один раз на весь запрос
             self.session = db_session
+            self.managed = True
 
     def transaction_v2(self) -> AsyncContextManager[AsyncSession]:
         @asynccontextmanager
         async def transaction() -> AsyncContextManager[AsyncSession]:
+            if self.managed:
+                yield self.session
+                return
+
             async with self.session as session:  # type: AsyncSession
                 try:
                     yield session
@@ -52,7 +72,7 @@ class BaseCRUD(ABC):
                     logger.error(f"Произошла ошибка в транзакции: {exc}")
                     await session.rollback()
                     raise exc
-                finally:
+                else:
                     await session.commit()
 
         return transaction()
@@ -62,11 +82,134 @@ class BaseCRUD(ABC):
         self.session.add(add_model)
         return add_model
 
+    async def insert_many(
+        self,
+        rows: Sequence[Mapping[str, Any]],
+        chunk_size: int = 5000,
+        ignore_conflicts: bool = False,
+    ) -> List[Any]:
+        """
+        Bulk insert: COPY into a temporary table, then INSERT ... SELECT.
+        Returns primary keys of inserted rows
+        """
+        return await self._copy_insert(
+            rows=rows,
+            chunk_size=chunk_size,
+            ignore_conflicts=ignore_conflicts,
+        )
+
+    async def upsert_many(
+        self,
+        rows: Sequence[Mapping[str, Any]],
+        index_elements: Sequence[str],
+        update_columns: Optional[Sequence[str]] = None,
+        chunk_size: int = 5000,
+    ) -> List[Any]:
+        """
+        Bulk INSERT ... ON CONFLICT DO UPDATE through a temporary table.
+        Of rows with the same conflict key the last one wins.
+        Returns primary keys of inserted and updated rows
+        """
+        unique = {tuple(row[key] for key in index_elements): row for row in rows}
+        return await self._copy_insert(
+            rows=list(unique.values()),
+            chunk_size=chunk_size,
+            index_elements=index_elements,
+            update_columns=update_columns,
+        )
+
+    async def _copy_insert(
+        self,
+        rows: Sequence[Mapping[str, Any]],
+        chunk_size: int,
+        ignore_conflicts: bool = False,
+        index_elements: Optional[Sequence[str]] = None,
+        update_columns: Optional[Sequence[str]] = None,
+    ) -> List[Any]:
+        if not rows:
+            return []
+
+        target = self.model.__table__
+        rows = [self._apply_defaults(row) for row in rows]
+        names = [c.name for c in target.columns if c.name in rows[0]]
+        # SQL-выражения по умолчанию (current_timestamp) вычисляет сама база
+        sql_defaults = [
+            c for c in target.columns
+            if c.name not in names
+            and c.default is not None
+            and c.default.is_clause_element
+        ]
+
+        staging_name = f"bulk_{target.name}_{uuid4().hex[:12]}"
+        staging = table(staging_name, *(column(name) for name in names))
+
+        stmt = insert(target).from_select(
+            names + [c.name for c in sql_defaults],
+            select(*staging.c, *(c.default.arg for c in sql_defaults)),
+        )
+        if index_elements is not None:
+            if update_columns is None:
+                update_columns = [
+                    name for name in names
+                    if name not in index_elements
+                    and name not in target.primary_key.columns
+                ]
+            stmt = stmt.on_conflict_do_update(
+                index_elements=index_elements,
+                set_={name: stmt.excluded[name] for name in update_columns},
+            )
+        elif ignore_conflicts:
+            stmt = stmt.on_conflict_do_nothing()
+        stmt = stmt.returning(*target.primary_key.columns)
+
+        # Временная таблица создается через SQLAlchemy, чтобы COPY
+        # выполнялся в уже открытой транзакции этого соединения.
+        # Выражение передается в get_bind, чтобы запись была учтена
+        # маршрутизацией read-your-writes
+        connection = await self.session.connection(bind_arguments={"clause": stmt})
+        await connection.execute(
+            text(
+                f"CREATE TEMPORARY TABLE {staging_name} ON COMMIT DROP AS "
+                f"SELECT {', '.join(names)} FROM {target.name} WITH NO DATA"
+            )
+        )
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+
+        keys = []
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            await driver_connection.copy_records_to_table(
+                staging_name,
+                records=[tuple(row.get(name) for name in names) for row in chunk],
+                columns=names,
+            )
+            result = await connection.execute(stmt)
+            keys.extend(result.scalars().all())
+            await connection.execute(text(f"TRUNCATE {staging_name}"))
+
+        await connection.execute(text(f"DROP TABLE {staging_name}"))
+        return keys
+
+    def _apply_defaults(self, row: Mapping[str, Any]) -> dict:
+        """Python-side column defaults (e.g. uuid7 keys), which COPY bypasses"""
+        row = dict(row)
+        for c in self.model.__table__.columns:
+            if c.key in row or c.default is None:
+                continue
+            if c.default.is_callable:
+                row[c.key] = c.default.arg(None)
+            elif c.default.is_scalar:
+                row[c.key] = c.default.arg
+        return row
+
+    @read_replica
     async def get_one(self, *args) -> Model:
         stmt = select(self.model).where(*args)
         result = await self.session.execute(stmt)
         return result.scalar_one()
 
+    @read_replica
     async def get_many(self, *args: Any) -> Model:
         query_model = self.model
         stmt = lambda_stmt(lambda: select(query_model))
@@ -85,6 +228,7 @@ class BaseCRUD(ABC):
             .execution_options(synchronize_session="fetch")
         )
 
+        mark_written(self.session)
         result = await self.session.execute(stmt)
         return result
 
@@ -96,6 +240,38 @@ class BaseCRUD(ABC):
         res = await self._update(*args, **kwargs)
         return res.scalars().all()
 
+    @read_replica
+    async def get_page(
+        self,
+        *args: Any,
+        limit: int,
+        cursor: Optional[Any] = None,
+        options: Sequence[Any] = (),
+    ) -> Page:
+        """
+        Keyset-пагинация по первичному ключу: для uuid7 порядок совпадает
+        с порядком создания, страница читается по индексу без OFFSET
+        """
+        key = inspect(self.model).primary_key[0]
+        stmt = (
+            select(self.model)
+            .where(*args)
+            .options(*options)
+            .order_by(key)
+            .limit(limit + 1)
+        )
+        if cursor is not None:
+            stmt = stmt.where(key > cursor)
+
+        result = await self.session.execute(stmt)
+        items = result.scalars().all()
+        if len(items) <= limit:
+            return Page(items=items)
+
+        items = items[:limit]
+        return Page(items=items, next_cursor=getattr(items[-1], key.key))
+
+    @read_replica
     async def exists(self, *args: Any) -> Optional[bool]:
         """Check is row exists in database"""
         stmt = exists(select(self.model).where(*args)).select()
@@ -103,6 +279,7 @@ class BaseCRUD(ABC):
         result = result_stmt.scalar()
         return cast(Optional[bool], result)
 
+    @read_replica
     async def exists_get(self, *args: Any) -> List[Model]:
         """Check is row exists in database. If it does, returns the row"""
         stmt = select(self.model).where(*args)
@@ -132,6 +309,7 @@ class BaseCRUD(ABC):
     async def soft_cascade_delete_many(self, *args: Any) -> List[Model]:
         return await self.update_many(*args, status_id=0)
 
+    @read_replica
     async def count(self, *args: Any) -> int:
         stmt = select(func.count()).select_from(
             select(self.model).where(*args).subquery()
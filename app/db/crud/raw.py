@@ -0,0 +1,54 @@
+import time
+from typing import Any
+from typing import Callable
+from typing import List
+from typing import TypeVar
+
+from asyncpg import Connection
+from asyncpg import Record
+from sqlalchemy.exc import NoResultFound
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.metrics import query_label_var
+from app.db.metrics import record_query
+
+Row = TypeVar("Row")
+
+
+class RawCRUD:
+    """
+    Рукописные запросы напрямую в соединение asyncpg, взятое из пула
+    SQLAlchemy через сессию запроса: маршрутизация на реплику и транзакция
+    те же, что у ORM, но без компиляции выражений и гидратации моделей.
+    Подготовленные запросы переиспользуются кэшем statement'ов asyncpg
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def driver_connection(self) -> Connection:
+        connection = await self.session.connection()
+        raw_connection = await connection.get_raw_connection()
+        return raw_connection.driver_connection
+
+    async def fetch(
+        self, query: str, *args: Any, row: Callable[[Record], Row]
+    ) -> List[Row]:
+        driver_connection = await self.driver_connection()
+        started_at = time.perf_counter()
+        records = await driver_connection.fetch(query, *args)
+        record_query(
+            label=query_label_var.get(),
+            elapsed=time.perf_counter() - started_at,
+            rows=len(records),
+        )
+        return [row(record) for record in records]
+
+    async def fetch_one(
+        self, query: str, *args: Any, row: Callable[[Record], Row]
+    ) -> Row:
+        rows = await self.fetch(query, *args, row=row)
+        if not rows:
+            # Как Result.scalar_one: orm_error_handler превратит в 400
+            raise NoResultFound("No row was found when one was required")
+        return rows[0]
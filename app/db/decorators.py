@@ -5,6 +5,8 @@ from sqlalchemy.exc import DBAPIError
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.exc import NoResultFound
 
+from app.db.metrics import query_label
+from app.db.routing import route_to
 from app.exceptions.db.exceptions import handle_db_api_error
 from app.exceptions.db.exceptions import handle_foreign_key_error
 from app.exceptions.db.exceptions import handle_not_found_error
@@ -18,7 +20,8 @@ def orm_error_handler(func):
     @wraps(func)
     async def decorator(*args, **kwargs):
         try:
-            return await func(*args, **kwargs)
+            with query_label(func.__qualname__):
+                return await func(*args, **kwargs)
 
         except IntegrityError as exc:
             logger.warning(msg="error orm_error_handler", exc_info=exc)
@@ -41,3 +44,14 @@ def orm_error_handler(func):
             print(f"\n\n\n\n\n ошибка \n\n\n\n")
             logger.warning(msg="error orm_error_handler", exc_info=exc)
     return decorator
+
+
+def read_replica(func):
+    """
+    Метод только читает данные и может обслуживаться репликой
+    """
+    @wraps(func)
+    async def decorator(*args, **kwargs):
+        with route_to(read_only=True):
+            return await func(*args, **kwargs)
+    return decorator
@@ -0,0 +1,130 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+from typing import Optional
+
+from prometheus_client import Counter
+from prometheus_client import Histogram
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.db.slow_queries import SlowQueryLog
+
+DB_ROUTED_STATEMENTS = Counter(
+    "db_routed_statements_total",
+    "Маршрутизация запросов между основной базой и репликами",
+    ["engine"],
+)
+DB_ENGINE_LATENCY = Histogram(
+    "db_engine_statement_latency_seconds",
+    "Время выполнения запросов по экземплярам базы данных",
+    ["engine"],
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_latency_seconds",
+    "Время выполнения запросов по методам репозиториев",
+    ["method"],
+)
+DB_QUERY_ROWS = Histogram(
+    "db_query_rows",
+    "Количество строк, возвращенных или измененных запросом",
+    ["method"],
+    buckets=(0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000),
+)
+
+query_label_var: ContextVar[str] = ContextVar("query_label", default="unknown")
+
+
+class QueryStats:
+    """
+    Счетчики запросов к базе в рамках одного HTTP-запроса
+    """
+
+    __slots__ = ("count", "duration")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+query_stats_var: ContextVar[Optional[QueryStats]] = ContextVar(
+    "query_stats", default=None
+)
+
+
+@contextmanager
+def query_label(label: str) -> Iterator[None]:
+    token = query_label_var.set(label)
+    try:
+        yield
+    finally:
+        query_label_var.reset(token)
+
+
+@contextmanager
+def collect_query_stats() -> Iterator[QueryStats]:
+    stats = QueryStats()
+    token = query_stats_var.set(stats)
+    try:
+        yield stats
+    finally:
+        query_stats_var.reset(token)
+
+
+def record_query(label: str, elapsed: float, rows: Optional[int]) -> None:
+    DB_QUERY_LATENCY.labels(label).observe(elapsed)
+    if rows is not None:
+        DB_QUERY_ROWS.labels(label).observe(rows)
+
+    stats = query_stats_var.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += elapsed
+
+
+def _row_count(cursor) -> Optional[int]:
+    # Драйвер asyncpg выставляет rowcount только для DML, число строк
+    # SELECT записывает RawCRUD, а для ORM-чтений метрика не пишется
+    if cursor.rowcount >= 0:
+        return cursor.rowcount
+    return None
+
+
+def instrument_queries(
+    engine: AsyncEngine,
+    name: str,
+    slow_query_log: Optional[SlowQueryLog] = None,
+) -> None:
+    """
+    Замер каждого запроса: по экземпляру базы, по методу репозитория
+    (query_label), в счетчики текущего HTTP-запроса и в журнал
+    медленных запросов
+    """
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        # Время начала хранится в контексте выполнения: он живет
+        # ровно один запрос и не копится при ошибках драйвера
+        context._query_started_at = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        elapsed = time.perf_counter() - context._query_started_at
+        label = query_label_var.get()
+
+        DB_ROUTED_STATEMENTS.labels(name).inc()
+        DB_ENGINE_LATENCY.labels(name).observe(elapsed)
+        record_query(label=label, elapsed=elapsed, rows=_row_count(cursor))
+
+        if slow_query_log is not None:
+            slow_query_log.observe(
+                engine=engine,
+                engine_name=name,
+                statement=statement,
+                parameters=parameters,
+                context=context,
+                many=many,
+                elapsed=elapsed,
+                label=label,
+            )
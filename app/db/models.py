@@ -61,7 +61,8 @@ class StatusMixin(Base):
 
     @declared_attr
     def status(cls):
-        return relationship(argument="Statuses", viewonly=True, lazy="joined")
+        # Статус берется из реестра справочников по status_id
+        return relationship(argument="Statuses", viewonly=True, lazy="raise")
 
 
 class User(TimestampMixin, StatusMixin, Base):
@@ -111,6 +112,8 @@ class SessionDevice(Base):
     country = Column(String)
     city = Column(String)
 
+    fingerprint = Column(String(64), index=True, unique=True, nullable=True)
+
 
 class UserSession(StatusMixin, Base):
     __tablename__ = "users_sessions"
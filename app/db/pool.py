@@ -0,0 +1,132 @@
+import time
+from typing import Any
+
+from prometheus_client import Counter
+from prometheus_client import Gauge
+from prometheus_client import Histogram
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import QueuePool
+
+DB_POOL_SIZE = Gauge("db_pool_size", "Размер пула соединений", ["engine"])
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Соединения, выданные из пула", ["engine"]
+)
+DB_POOL_IDLE = Gauge("db_pool_idle", "Свободные соединения в пуле", ["engine"])
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Соединения сверх pool_size (max_overflow)", ["engine"]
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Время получения соединения из пула, включая ожидание и подключение",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Превышения pool_timeout при получении соединения",
+    ["engine"],
+)
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool с замером времени выдачи соединения
+    """
+
+    name = "primary"
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_CHECKOUT_TIMEOUTS.labels(self.name).inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(self.name).observe(
+                time.perf_counter() - started_at
+            )
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.name = self.name
+        return pool
+
+
+def instrument_engine(engine: AsyncEngine, name: str) -> None:
+    """
+    Подписывает пул движка на метрики. Значения читаются при сборе метрик,
+    поэтому пул, пересозданный после dispose(), учитывается автоматически
+    """
+    sync_engine = engine.sync_engine
+    if not isinstance(sync_engine.pool, QueuePool):
+        return
+    sync_engine.pool.name = name
+
+    DB_POOL_SIZE.labels(name).set_function(lambda: sync_engine.pool.size())
+    DB_POOL_CHECKED_OUT.labels(name).set_function(
+        lambda: sync_engine.pool.checkedout()
+    )
+    DB_POOL_IDLE.labels(name).set_function(lambda: sync_engine.pool.checkedin())
+    # QueuePool.overflow() отрицателен, пока pool_size не исчерпан
+    DB_POOL_OVERFLOW.labels(name).set_function(
+        lambda: max(sync_engine.pool.overflow(), 0)
+    )
+
+
+def pool_size_for_worker(
+    connection_budget: int,
+    workers: int,
+    max_overflow: int,
+    reserved: int = 0,
+) -> int:
+    """
+    Размер пула на один процесс из общего лимита соединений к базе:
+    (бюджет - резерв) делится между воркерами, из доли вычитается
+    max_overflow. Не меньше одного соединения
+    """
+    per_worker = (connection_budget - reserved) // max(workers, 1)
+    return max(per_worker - max_overflow, 1)
+
+
+# PgBouncer в режиме pool_mode=transaction отдает серверное соединение
+# другому клиенту после каждой транзакции: кэши подготовленных запросов
+# asyncpg и SQLAlchemy выключены, а одноразовые запросы получают
+# уникальные имена (см. asyncpg_utils.monkey_patch)
+POOLER_CONNECT_ARGS = {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+
+
+def engine_options(
+    pool_size: int,
+    max_overflow: int,
+    pool_timeout: float,
+    pool_pre_ping: bool,
+    pool_recycle: int,
+    pooler_mode: bool = False,
+    connect_timeout: float = 30,
+) -> dict[str, Any]:
+    """
+    Аргументы create_async_engine. pool_size=0 означает NullPool:
+    соединение открывается на каждую сессию, пулом занимается PgBouncer
+    """
+    connect_args: dict[str, Any] = {"timeout": connect_timeout}
+    if pooler_mode:
+        connect_args.update(POOLER_CONNECT_ARGS)
+
+    options = dict(future=True, echo=False, connect_args=connect_args)
+    if pool_size == 0:
+        options.update(poolclass=NullPool, pool_pre_ping=pool_pre_ping)
+        return options
+
+    options.update(
+        poolclass=InstrumentedAsyncPool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_pre_ping=pool_pre_ping,
+        pool_recycle=pool_recycle,
+    )
+    return options
@@ -0,0 +1,95 @@
+from functools import lru_cache
+from typing import Any
+from typing import Type
+from typing import Union
+
+from pydantic import BaseModel
+from sqlalchemy import Column
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import load_only
+from sqlalchemy.orm import raiseload
+
+# Модель ответа или имя поля; вложенные поля через точку: "role.title"
+FieldSpec = Union[Type[BaseModel], str]
+
+
+def projection(model: Type[Any], *specs: FieldSpec) -> tuple:
+    """
+    Опции загрузки, выбирающие только поля, нужные моделям ответа:
+    load_only для колонок, joinedload для вложенных моделей и raiseload
+    для остальных связей, включая объявленные с lazy="joined".
+    Результат кэшируется по набору спецификаций
+    """
+    return _build_projection(model, specs)
+
+
+@lru_cache(maxsize=256)
+def _build_projection(model: Type[Any], specs: tuple[FieldSpec, ...]) -> tuple:
+    tree: dict[str, dict] = {}
+    for spec in specs:
+        _merge(tree, _spec_tree(spec))
+    return _options(model, tree)
+
+
+def _spec_tree(spec: FieldSpec) -> dict[str, dict]:
+    if isinstance(spec, str):
+        tree = node = {}
+        for part in spec.split("."):
+            node = node.setdefault(part, {})
+        return tree
+
+    tree = {}
+    # Поля, которые getter_dict модели вычисляет из других атрибутов
+    sources = getattr(spec.__config__.getter_dict, "sources", {})
+    for name, field in spec.__fields__.items():
+        nested = field.type_
+        if name in sources:
+            tree[sources[name]] = {}
+        elif isinstance(nested, type) and issubclass(nested, BaseModel):
+            tree[name] = _spec_tree(nested)
+        else:
+            tree[name] = {}
+    return tree
+
+
+def _merge(target: dict, source: dict) -> None:
+    for name, subtree in source.items():
+        _merge(target.setdefault(name, {}), subtree)
+
+
+def _options(model: Type[Any], tree: dict[str, dict], path=None) -> tuple:
+    mapper = inspect(model)
+    # query_expression заполняется через with_expression, а не load_only
+    columns = [
+        getattr(model, name)
+        for name in tree
+        if name in mapper.column_attrs
+        and isinstance(mapper.column_attrs[name].expression, Column)
+    ]
+    # Первичный ключ нужен для identity map
+    for key in mapper.primary_key:
+        attribute = getattr(model, mapper.get_property_by_column(key).key)
+        if attribute not in columns:
+            columns.append(attribute)
+
+    if path is None:
+        options = [load_only(*columns)]
+    else:
+        options = [path.load_only(*columns)]
+
+    for name, subtree in tree.items():
+        relationship = mapper.relationships.get(name)
+        if relationship is None:
+            continue
+        loader = (
+            joinedload(getattr(model, name))
+            if path is None
+            else path.joinedload(getattr(model, name))
+        )
+        options.extend(_options(relationship.mapper.class_, subtree, loader))
+
+    options.append(
+        raiseload("*") if path is None else path.raiseload("*")
+    )
+    return tuple(options)
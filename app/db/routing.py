@@ -0,0 +1,207 @@
+import asyncio
+import itertools
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+from typing import Iterator
+from typing import Optional
+from typing import Union
+from uuid import UUID
+
+from cashews import Cache
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.query import FromStatement
+
+from app.db.uow import current_unit_of_work
+
+logger = logging.getLogger(__name__)
+
+# None - маршрут не задан, True - чтение с реплики, False - основная база
+read_only_var: ContextVar[Optional[bool]] = ContextVar("read_only", default=None)
+
+
+@contextmanager
+def route_to(read_only: bool) -> Iterator[None]:
+    """
+    Внешний маршрут имеет приоритет над вложенными вызовами
+    """
+    if read_only_var.get() is not None:
+        yield
+        return
+
+    token = read_only_var.set(read_only)
+    try:
+        yield
+    finally:
+        read_only_var.reset(token)
+
+
+def mark_written(session: Union[AsyncSession, Session]) -> None:
+    """
+    Явная отметка записи для выражений, в которых get_bind не видит DML:
+    UPDATE ... RETURNING внутри CTE или select().from_statement()
+    """
+    session.info["wrote"] = True
+    session.info["primary"] = True
+
+
+def _is_dml(clause: Any) -> bool:
+    # select(Model).from_statement(update(...)) сам по себе не DML
+    if isinstance(clause, FromStatement):
+        clause = clause.element
+    return getattr(clause, "is_dml", False)
+
+
+class ReplicaRouter:
+    """
+    Выбор экземпляра базы для чтения: реплики с проверкой доступности,
+    round-robin или least-connections, и окно read-your-writes
+    для пользователя после записи
+    """
+
+    STICKY_KEY = "v2:db:read_your_writes:{user_uuid}"
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replicas: list[AsyncEngine],
+        strategy: str,
+        read_your_writes: float,
+        health_interval: float,
+        cache: Cache,
+    ):
+        self.primary = primary
+        self.replicas = replicas
+        self.strategy = strategy
+        self.read_your_writes = read_your_writes
+        self.health_interval = health_interval
+        self.cache = cache
+
+        self.names = {primary.sync_engine: "primary"}
+        for index, replica in enumerate(replicas):
+            self.names[replica.sync_engine] = f"replica-{index}"
+        self.healthy = {replica.sync_engine: True for replica in replicas}
+        self._round_robin = itertools.cycle(range(len(replicas) or 1))
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def choose_replica(self) -> Engine:
+        healthy = [
+            replica.sync_engine
+            for replica in self.replicas
+            if self.healthy[replica.sync_engine]
+        ]
+        if not healthy:
+            return self.primary.sync_engine
+
+        if self.strategy == "least_connections":
+            return min(healthy, key=lambda engine: engine.pool.checkedout())
+
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._round_robin)].sync_engine
+            if self.healthy[replica]:
+                return replica
+        return healthy[0]
+
+    async def track_user(self, user_uuid: UUID) -> None:
+        """
+        Привязка запроса к пользователю: чтения идут в основную базу,
+        если пользователь недавно писал, а запись в этом запросе
+        продлевает окно read-your-writes
+        """
+        unit_of_work = current_unit_of_work()
+        if not self.enabled or unit_of_work is None:
+            return
+
+        info = unit_of_work.session.info
+        if info.get("tracked_user") is None:
+            info["tracked_user"] = user_uuid
+            unit_of_work.after_commit(lambda: self._remember_write(info))
+
+        try:
+            sticky = await self.cache.get(self.STICKY_KEY.format(user_uuid=user_uuid))
+        except Exception as exc:
+            logger.warning(msg="read-your-writes state is unavailable", exc_info=exc)
+            sticky = True
+        if sticky:
+            info["primary"] = True
+
+    async def _remember_write(self, info: dict) -> None:
+        if not info.get("wrote"):
+            return
+        await self.cache.set(
+            self.STICKY_KEY.format(user_uuid=info["tracked_user"]),
+            1,
+            expire=self.read_your_writes,
+        )
+
+    async def start(self) -> None:
+        if self.enabled:
+            self._task = asyncio.create_task(self._health_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _health_loop(self) -> None:
+        while True:
+            for replica in self.replicas:
+                await self._check(replica)
+            await asyncio.sleep(self.health_interval)
+
+    async def _check(self, replica: AsyncEngine) -> None:
+        try:
+            async with replica.connect() as connection:
+                await asyncio.wait_for(
+                    connection.execute(text("SELECT 1")),
+                    timeout=self.health_interval,
+                )
+        except Exception as exc:
+            if self.healthy[replica.sync_engine]:
+                logger.warning(
+                    msg=f"{self.names[replica.sync_engine]} is unhealthy",
+                    exc_info=exc,
+                )
+            self.healthy[replica.sync_engine] = False
+        else:
+            self.healthy[replica.sync_engine] = True
+
+
+class RoutingSession(Session):
+    """
+    Запросы из методов, помеченных как только чтение, уходят на реплику.
+    Все остальное выполняется в основной базе, а запись (flush или DML)
+    закрепляет сессию за ней до конца запроса
+    """
+
+    def __init__(self, *args, router: Optional[ReplicaRouter] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.router = router
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        router = self.router
+        if router is None or not router.enabled:
+            return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+        # Окно read-your-writes открывает только запись: flush
+        # и DML-выражения. Непомеченные чтения идут в основную базу,
+        # но не закрепляют за ней ни запрос, ни пользователя
+        if self._flushing or _is_dml(clause):
+            mark_written(self)
+
+        if self.info.get("primary") or not read_only_var.get():
+            return router.primary.sync_engine
+
+        replica = self.info.get("replica")
+        if replica is None:
+            replica = self.info["replica"] = router.choose_replica()
+        return replica
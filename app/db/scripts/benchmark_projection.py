@@ -0,0 +1,94 @@
+"""
+Сравнение загрузки пользователей целиком и с проекцией по модели ответа:
+ширина строки результата (колонки и байты) и время выполнения с гидратацией.
+
+Запуск: python -m app.db.scripts.benchmark_projection
+        [--iterations 200] [--limit 100]
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+
+from app.db.models import User
+from app.db.projection import projection
+from app.v1.users.schemas import GetCurrentUserModel
+from app.v1.users.schemas import GetUserWithPhoneEmail
+from misc import async_session
+from misc import engine
+
+FULL = (joinedload(User.avatar), joinedload(User.role))
+
+
+async def measure(name: str, stmt, iterations: int) -> None:
+    async with async_session() as session:
+        connection = await session.connection()
+        compiled = stmt.compile(dialect=engine.dialect)
+        params = compiled.construct_params()
+        width = await connection.exec_driver_sql(
+            f"SELECT avg(pg_column_size(q.*)) FROM ({compiled}) AS q",
+            tuple(params[key] for key in compiled.positiontup),
+        )
+        width = float(width.scalar() or 0)
+
+        columns = 0
+        started_at = time.perf_counter()
+        for _ in range(iterations):
+            result = await session.execute(stmt)
+            result.scalars().all()
+            columns = len(result.raw.keys())
+            session.expunge_all()
+        elapsed = (time.perf_counter() - started_at) / iterations
+
+    print(f"{name:<40} {columns:>8} {width:>10.0f} {elapsed * 1000:>10.3f}")
+
+
+async def main(iterations: int, limit: int) -> None:
+    async with async_session() as session:
+        sample = await session.execute(select(User.uuid, User.phone).limit(1))
+        uuid, phone = sample.one()
+
+    cases = [
+        (
+            "GetCurrentUser",
+            select(User).filter(User.uuid == uuid),
+            (GetCurrentUserModel, "status_id"),
+        ),
+        (
+            "get_one_from_uuid",
+            select(User).filter(User.uuid == uuid),
+            (GetUserWithPhoneEmail,),
+        ),
+        (
+            f"get_all (limit {limit})",
+            select(User).order_by(User.uuid).limit(limit),
+            (GetUserWithPhoneEmail,),
+        ),
+        (
+            "get_one_from_phone",
+            select(User).filter(User.phone == phone),
+            ("uuid", "phone", "password", "status_id"),
+        ),
+    ]
+
+    print(f"{'query':<40} {'columns':>8} {'row bytes':>10} {'ms/query':>10}")
+    for name, stmt, fields in cases:
+        await measure(f"{name}: full", stmt.options(*FULL), iterations)
+        await measure(
+            f"{name}: projection",
+            stmt.options(*projection(User, *fields)),
+            iterations,
+        )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    asyncio.run(main(iterations=args.iterations, limit=args.limit))
@@ -0,0 +1,158 @@
+"""
+Быстрый путь asyncpg против ORM для самых частых чтений: GetCurrentUser,
+профиль по uuid и список сессий. Сначала сверяет ответы обоих путей
+на выборке пользователей, затем замеряет время запроса вместе
+со сборкой модели ответа.
+
+Запуск: python -m app.db.scripts.benchmark_raw_queries
+        [--iterations 500] [--sample 50] [--check-only]
+
+С --check-only только сверка: ненулевой код выхода при расхождении,
+пригодно для CI перед выкладкой изменений в запросах или моделях
+"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from uuid import UUID
+
+from sqlalchemy import func
+from sqlalchemy import select
+
+from app.db.models import User
+from app.db.models import UserSession
+from app.v1.reference.registry import reference_registry
+from app.v1.security.repo import UserSessionRepository
+from app.v1.security.schemas import SessionModel
+from app.v1.users.repo import UserRepository
+from app.v1.users.schemas import GetCurrentUserModel
+from app.v1.users.schemas import GetUserWithPhoneEmail
+from misc import async_session
+from misc import engine
+
+Case = Callable[[Any, UUID, UUID], Awaitable[Any]]
+
+
+async def principal_orm(session, uuid: UUID, _: UUID):
+    user = await UserRepository(db_session=session).get_one_from_uuid(
+        uuid=uuid, author_uuid=uuid, fields=(GetCurrentUserModel, "status_id")
+    )
+    return user.status_id, GetCurrentUserModel.from_orm(user)
+
+
+async def principal_raw(session, uuid: UUID, _: UUID):
+    user = await UserRepository(db_session=session).get_principal_row(uuid=uuid)
+    return user.status_id, GetCurrentUserModel.from_orm(user)
+
+
+async def profile_orm(session, uuid: UUID, author_uuid: UUID):
+    user = await UserRepository(db_session=session).get_one_from_uuid(
+        uuid=uuid, author_uuid=author_uuid
+    )
+    return GetUserWithPhoneEmail.from_orm(user)
+
+
+async def profile_raw(session, uuid: UUID, author_uuid: UUID):
+    user = await UserRepository(db_session=session).get_profile_row(
+        uuid=uuid, author_uuid=author_uuid
+    )
+    return GetUserWithPhoneEmail.from_orm(user)
+
+
+async def sessions_orm(session, uuid: UUID, _: UUID):
+    rows = await UserSessionRepository(db_session=session).get_all(uuid=uuid)
+    return sorted((SessionModel.from_orm(row) for row in rows), key=_by_uuid)
+
+
+async def sessions_raw(session, uuid: UUID, _: UUID):
+    rows = await UserSessionRepository(db_session=session).get_all_rows(uuid=uuid)
+    return sorted((SessionModel.from_orm(row) for row in rows), key=_by_uuid)
+
+
+def _by_uuid(model: SessionModel) -> UUID:
+    return model.uuid
+
+
+CASES: list[tuple[str, Case, Case]] = [
+    ("GetCurrentUser", principal_orm, principal_raw),
+    ("get_one_from_uuid", profile_orm, profile_raw),
+    ("sessions", sessions_orm, sessions_raw),
+]
+
+
+async def check(users: list[UUID]) -> int:
+    mismatches = 0
+    author_uuid = users[0]
+    for name, orm_path, raw_path in CASES:
+        for uuid in users:
+            async with async_session() as session:
+                expected = await orm_path(session, uuid, author_uuid)
+                actual = await raw_path(session, uuid, author_uuid)
+            if expected != actual:
+                mismatches += 1
+                print(f"{name}: {uuid} differs\n  orm: {expected}\n  raw: {actual}")
+    return mismatches
+
+
+async def measure(name: str, path: Case, users: list[UUID], iterations: int) -> None:
+    async with async_session() as session:
+        started_at = time.perf_counter()
+        for index in range(iterations):
+            await path(session, users[index % len(users)], users[0])
+            session.expunge_all()
+        elapsed = (time.perf_counter() - started_at) / iterations
+
+    print(f"{name:<30} {elapsed * 1000:>10.3f}")
+
+
+async def main(iterations: int, sample: int, check_only: bool) -> int:
+    await reference_registry.load()
+    async with async_session() as session:
+        # Пользователи с наибольшим числом сессий, чтобы список не был пустым
+        result = await session.execute(
+            select(User.uuid)
+            .outerjoin(UserSession, UserSession.user_id == User.uuid)
+            .group_by(User.uuid)
+            .order_by(func.count(UserSession.uuid).desc())
+            .limit(sample)
+        )
+        users = result.scalars().all()
+    if not users:
+        print("no users to compare")
+        await engine.dispose()
+        return 0
+
+    mismatches = await check(users)
+    print(f"checked {len(users)} users, {mismatches} mismatches")
+    if check_only or mismatches:
+        await engine.dispose()
+        return 1 if mismatches else 0
+
+    print(f"{'query':<30} {'ms/query':>10}")
+    for name, orm_path, raw_path in CASES:
+        await measure(f"{name}: orm", orm_path, users, iterations)
+        await measure(f"{name}: raw", raw_path, users, iterations)
+
+    await engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--sample", type=int, default=50)
+    parser.add_argument("--check-only", action="store_true")
+    args = parser.parse_args()
+
+    sys.exit(
+        asyncio.run(
+            main(
+                iterations=args.iterations,
+                sample=args.sample,
+                check_only=args.check_only,
+            )
+        )
+    )
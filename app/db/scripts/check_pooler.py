@@ -0,0 +1,175 @@
+"""
+Проверка и сравнение пропускной способности: Postgres напрямую и через
+PgBouncer в режиме pool_mode=transaction.
+
+Запуск: python -m app.db.scripts.check_pooler
+        [--pooler-host 127.0.0.1] [--pooler-port 6432]
+        [--workers 8] [--concurrency 16] [--duration 10]
+
+Каждый "воркер" - отдельный движок со своим пулом, как процесс
+приложения. Нагрузка в одной транзакции: ORM-запрос с подготовкой,
+запрос быстрого пути asyncpg и UPDATE с откатом. Прогоны:
+
+- direct: напрямую, обычные настройки
+- pooler (default): через PgBouncer без режима совместимости,
+  ожидаемы ошибки подготовленных запросов
+- pooler (pooler mode): через PgBouncer с POSTGRES_POOLER_MODE
+
+Код выхода 1, если в последнем прогоне были ошибки
+"""
+import argparse
+import asyncio
+import sys
+import time
+from collections import Counter
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.crud.raw import RawCRUD
+from app.db.dsn import generate_dsn_postgres
+from app.db.models import User
+from app.db.pool import engine_options
+from app.v1.users.repo import USER_ROW_QUERY
+from app.v1.users.rows import UserRow
+from config import settings_app
+
+
+def make_engine(
+    host: str, port: int, pooler_mode: bool, pool_size: int
+) -> AsyncEngine:
+    dsn = generate_dsn_postgres(
+        user=settings_app.DB_USERNAME,
+        password=settings_app.DB_PASSWORD,
+        host=host,
+        port=port,
+        database_name=settings_app.DB_BASENAME,
+    )
+    return create_async_engine(
+        dsn,
+        **engine_options(
+            pool_size=pool_size,
+            max_overflow=0,
+            pool_timeout=settings_app.DB_POOL_TIMEOUT,
+            pool_pre_ping=False,
+            pool_recycle=settings_app.DB_POOL_RECYCLE,
+            pooler_mode=pooler_mode,
+        ),
+    )
+
+
+async def operation(session_factory: sessionmaker, uuid: UUID) -> None:
+    async with session_factory() as session:
+        await session.execute(
+            select(User.uuid, User.login).where(User.uuid == uuid)
+        )
+        await RawCRUD(session=session).fetch_one(
+            USER_ROW_QUERY, uuid, uuid, row=UserRow
+        )
+        await session.execute(
+            update(User)
+            .where(User.uuid == uuid)
+            .values(last_activity=User.last_activity)
+        )
+        await session.rollback()
+
+
+async def worker(
+    session_factory: sessionmaker,
+    users: list[UUID],
+    deadline: float,
+    results: Counter,
+) -> None:
+    index = 0
+    while time.monotonic() < deadline:
+        try:
+            await operation(session_factory, users[index % len(users)])
+        except Exception as exc:
+            results[type(exc).__name__] += 1
+        else:
+            results["ok"] += 1
+        index += 1
+
+
+async def run(
+    name: str,
+    host: str,
+    port: int,
+    pooler_mode: bool,
+    args: Any,
+    users: list[UUID],
+) -> int:
+    engines = [
+        make_engine(host, port, pooler_mode, pool_size=args.pool_size)
+        for _ in range(args.workers)
+    ]
+    results: Counter = Counter()
+    deadline = time.monotonic() + args.duration
+    started_at = time.perf_counter()
+    await asyncio.gather(
+        *(
+            worker(
+                sessionmaker(engine, class_=AsyncSession, expire_on_commit=False),
+                users,
+                deadline,
+                results,
+            )
+            for engine in engines
+            for _ in range(args.concurrency)
+        )
+    )
+    elapsed = time.perf_counter() - started_at
+    for engine in engines:
+        await engine.dispose()
+
+    ok = results.pop("ok", 0)
+    errors = sum(results.values())
+    details = ", ".join(f"{kind}: {count}" for kind, count in results.items())
+    print(f"{name:<24} {ok / elapsed:>10.1f} {errors:>8}  {details}")
+    return errors
+
+
+async def main(args: Any) -> int:
+    engine = make_engine(
+        settings_app.DB_HOST, settings_app.DB_PORT, pooler_mode=False, pool_size=1
+    )
+    async with engine.connect() as connection:
+        result = await connection.execute(select(User.uuid).limit(args.sample))
+        users = result.scalars().all()
+    await engine.dispose()
+    if not users:
+        print("no users to query")
+        return 1
+
+    print(f"{'target':<24} {'ops/s':>10} {'errors':>8}")
+    await run("direct", settings_app.DB_HOST, settings_app.DB_PORT, False, args, users)
+    if not args.skip_default:
+        await run(
+            "pooler (default)", args.pooler_host, args.pooler_port, False, args, users
+        )
+    errors = await run(
+        "pooler (pooler mode)", args.pooler_host, args.pooler_port, True, args, users
+    )
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pooler-host", default=settings_app.DB_HOST)
+    parser.add_argument("--pooler-port", type=int, default=6432)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--pool-size", type=int, default=settings_app.DB_POOLER_POOL_SIZE
+    )
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--sample", type=int, default=100)
+    parser.add_argument("--skip-default", action="store_true")
+
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,125 @@
+"""
+Обратное заполнение sessions_devices.fingerprint и схлопывание дубликатов.
+
+Запуск: python -m app.db.scripts.dedupe_session_devices [--batch-size 1000]
+
+Выполняется до выкладки кода с upsert устройств: ON CONFLICT (fingerprint)
+требует уникального индекса. Повторный запуск безопасен
+"""
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import text
+
+from app.v1.security.utils import DEVICE_FINGERPRINT_SQL
+from misc import autocommit_engine
+from misc import engine
+
+logger = logging.getLogger(__name__)
+
+ADD_COLUMN = text(
+    "ALTER TABLE sessions_devices ADD COLUMN IF NOT EXISTS fingerprint varchar(64)"
+)
+
+BACKFILL_BATCH = text(
+    f"""
+    UPDATE sessions_devices SET fingerprint = {DEVICE_FINGERPRINT_SQL}
+    WHERE uuid IN (
+        SELECT uuid FROM sessions_devices
+        WHERE fingerprint IS NULL
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    """
+)
+
+# CREATE TABLE AS не поддерживает параметры подготовленных запросов
+DUPLICATES_BATCH = """
+    CREATE TEMPORARY TABLE device_duplicates ON COMMIT DROP AS
+    SELECT uuid, keeper FROM (
+        SELECT uuid, first_value(uuid) OVER (
+            PARTITION BY fingerprint ORDER BY uuid
+        ) AS keeper
+        FROM sessions_devices
+        WHERE fingerprint IN (
+            SELECT fingerprint FROM sessions_devices
+            WHERE fingerprint IS NOT NULL
+            GROUP BY fingerprint
+            HAVING count(*) > 1
+            LIMIT {batch_size}
+        )
+    ) ranked
+    WHERE uuid <> keeper
+"""
+
+REPOINT_SESSIONS = text(
+    """
+    UPDATE users_sessions SET device_id = d.keeper
+    FROM device_duplicates d
+    WHERE users_sessions.device_id = d.uuid
+    """
+)
+
+DELETE_DUPLICATES = text(
+    """
+    DELETE FROM sessions_devices
+    USING device_duplicates d
+    WHERE sessions_devices.uuid = d.uuid
+    """
+)
+
+CREATE_UNIQUE_INDEX = text(
+    "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "
+    "ix_sessions_devices_fingerprint ON sessions_devices (fingerprint)"
+)
+
+
+async def backfill(batch_size: int) -> None:
+    total = 0
+    while True:
+        async with engine.begin() as connection:
+            result = await connection.execute(
+                BACKFILL_BATCH, {"batch_size": batch_size}
+            )
+        if not result.rowcount:
+            break
+        total += result.rowcount
+        logger.info(msg=f"fingerprint backfilled for {total} devices")
+
+
+async def collapse(batch_size: int) -> None:
+    total = 0
+    while True:
+        async with engine.begin() as connection:
+            await connection.execute(
+                text(DUPLICATES_BATCH.format(batch_size=int(batch_size)))
+            )
+            await connection.execute(REPOINT_SESSIONS)
+            result = await connection.execute(DELETE_DUPLICATES)
+        if not result.rowcount:
+            break
+        total += result.rowcount
+        logger.info(msg=f"collapsed {total} duplicate devices")
+
+
+async def main(batch_size: int) -> None:
+    async with engine.begin() as connection:
+        await connection.execute(ADD_COLUMN)
+
+    await backfill(batch_size=batch_size)
+    await collapse(batch_size=batch_size)
+
+    async with autocommit_engine.connect() as connection:
+        await connection.execute(CREATE_UNIQUE_INDEX)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(batch_size=args.batch_size))
@@ -0,0 +1,174 @@
+"""
+Импорт пользователей из CSV или NDJSON.
+
+Запуск: python -m app.db.scripts.import_users users.ndjson
+        [--format ndjson|csv] [--batch-size 5000] [--workers 8]
+
+Поля: phone, login, first_name, last_name, email, role_id, status_id и
+password (хэшируется bcrypt в пуле процессов) или password_hash
+(готовый bcrypt-хэш, например при переносе из старой системы авторизации).
+Существующие пользователи обновляются по телефону, повторный запуск безопасен:
+email, пароль, роль и статус перезаписываются, только если заданы в записи
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import time
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Tuple
+
+from pydantic import ValidationError
+
+from app.db.crud.base import BaseCRUD
+from app.db.models import User
+from app.v1.security.context import PasswordHasher
+from app.v1.security.context import get_password_hash
+from app.v1.users.schemas import ImportUserModel
+from app.v1.users.services import DEFAULT_AVATAR_ID
+from misc import async_session
+from misc import engine
+
+logger = logging.getLogger(__name__)
+
+UPDATE_COLUMNS = (
+    "login",
+    "first_name",
+    "last_name",
+)
+# Обновляются только при наличии в записи: значения по умолчанию
+# ImportUserModel нужны для новых пользователей, но у существующих
+# стерли бы пароль и email, понизили роль и вернули статус
+OPTIONAL_COLUMNS = (
+    "email",
+    "password",
+    "role_id",
+    "status_id",
+)
+
+
+def read_records(path: str, file_format: str) -> Iterator[Tuple[int, dict]]:
+    with open(path, newline="", encoding="utf-8") as file:
+        if file_format == "csv":
+            for line, record in enumerate(csv.DictReader(file), start=2):
+                yield line, {k: v for k, v in record.items() if v != ""}
+        else:
+            for line, raw in enumerate(file, start=1):
+                if raw.strip():
+                    yield line, json.loads(raw)
+
+
+def read_batches(
+    path: str, file_format: str, batch_size: int
+) -> Iterator[List[ImportUserModel]]:
+    batch = []
+    for line, record in read_records(path=path, file_format=file_format):
+        try:
+            batch.append(ImportUserModel.parse_obj(record))
+        except ValidationError as exc:
+            logger.warning(msg=f"line {line} skipped: {exc}")
+            continue
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def prepare_rows(
+    hasher: PasswordHasher, batch: List[ImportUserModel]
+) -> Dict[Tuple[str, ...], List[dict[str, Any]]]:
+    """
+    Строки для upsert, сгруппированные по набору обновляемых колонок
+    """
+    plain = [user for user in batch if user.password_hash is None and user.password]
+    hashes = await asyncio.gather(
+        *(hasher.run("hash", get_password_hash, user.password) for user in plain)
+    )
+    for user, password_hash in zip(plain, hashes):
+        user.password_hash = password_hash
+
+    # Из повторов телефона в пачке побеждает последний, как в upsert_many.
+    # Повторы убираются до разбиения на группы: иначе более ранняя запись
+    # из другой группы могла бы записаться после поздней
+    users = {user.phone: user for user in batch}
+
+    groups: Dict[Tuple[str, ...], List[dict[str, Any]]] = {}
+    for user in users.values():
+        row = {
+            "phone": user.phone,
+            "login": user.login,
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "email": user.email,
+            "password": user.password_hash,
+            "role_id": user.role_id,
+            "status_id": user.status_id,
+            "avatar_id": DEFAULT_AVATAR_ID,
+        }
+        # Хэш пароля приходит из password или password_hash,
+        # остальные колонки совпадают с полями модели
+        given = user.__fields_set__ | {"password"}
+        supplied = tuple(
+            name
+            for name in OPTIONAL_COLUMNS
+            if name in given and row[name] is not None
+        )
+        groups.setdefault(UPDATE_COLUMNS + supplied, []).append(row)
+    return groups
+
+
+async def main(path: str, file_format: str, batch_size: int, workers: int) -> None:
+    hasher = PasswordHasher(
+        executor="process",
+        max_workers=workers,
+        queue_size=batch_size,
+        timeout=3600,
+    )
+    crud = BaseCRUD(db_session=async_session, model=User)
+
+    total = 0
+    started_at = time.perf_counter()
+    try:
+        for batch in read_batches(path, file_format, batch_size):
+            groups = await prepare_rows(hasher=hasher, batch=batch)
+            async with crud.transaction_v2():
+                for update_columns, rows in groups.items():
+                    await crud.upsert_many(
+                        rows,
+                        index_elements=("phone",),
+                        update_columns=update_columns,
+                        chunk_size=batch_size,
+                    )
+                    total += len(rows)
+            elapsed = time.perf_counter() - started_at
+            logger.info(msg=f"imported {total} users, {total / elapsed:.0f} rows/s")
+    finally:
+        hasher.shutdown()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=("ndjson", "csv"), default=None)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    file_format = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(
+        main(
+            path=args.path,
+            file_format=file_format,
+            batch_size=args.batch_size,
+            workers=args.workers,
+        )
+    )
@@ -0,0 +1,58 @@
+"""
+Триггеры NOTIFY на таблицах roles и statuses: после изменения справочника
+процессы приложения перечитывают реестр, не дожидаясь таймера.
+
+Запуск: python -m app.db.scripts.reference_notify [--channel reference_data]
+
+Повторный запуск безопасен
+"""
+import argparse
+import asyncio
+import logging
+
+from config import settings_app
+from misc import engine
+
+logger = logging.getLogger(__name__)
+
+TABLES = ("roles", "statuses")
+
+# Имя канала подставляется в тело функции: параметры в DDL не поддерживаются
+CREATE_FUNCTION = """
+    CREATE OR REPLACE FUNCTION notify_reference_data() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_notify('{channel}', TG_TABLE_NAME);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+DROP_TRIGGER = "DROP TRIGGER IF EXISTS {table}_notify_reference_data ON {table}"
+
+CREATE_TRIGGER = """
+    CREATE TRIGGER {table}_notify_reference_data
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_reference_data()
+"""
+
+
+async def main(channel: str) -> None:
+    async with engine.begin() as connection:
+        await connection.exec_driver_sql(CREATE_FUNCTION.format(channel=channel))
+        for table in TABLES:
+            await connection.exec_driver_sql(DROP_TRIGGER.format(table=table))
+            await connection.exec_driver_sql(CREATE_TRIGGER.format(table=table))
+            logger.info(msg=f"notify trigger installed on {table}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--channel", default=settings_app.REFERENCE_NOTIFY_CHANNEL or "reference_data"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(channel=args.channel))
@@ -0,0 +1,238 @@
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import re
+import time
+from typing import Any
+from typing import Optional
+from typing import Sequence
+
+from prometheus_client import Counter
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.utils.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+DB_SLOW_QUERIES = Counter(
+    "db_slow_queries_total",
+    "Запросы дольше порога медленного запроса",
+    ["method"],
+)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:(?:%s|\?)\s*,\s*)+(?:%s|\?)\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_LOCKING_CLAUSE = re.compile(r"\bFOR\s+(UPDATE|SHARE)\b", re.IGNORECASE)
+_BIND_SUFFIX = re.compile(r"_\d+$")
+
+_MAX_VALUE_LENGTH = 64
+
+# Параметры, значения которых попадают в журнал. Имя сравнивается без
+# суффикса SQLAlchemy (uuid_1 -> uuid), все остальное скрывается,
+# в том числе позиционные параметры ($1) и анонимные param_N
+SAFE_PARAMETERS = (
+    "uuid",
+    "id",
+    "user_id",
+    "role_id",
+    "status_id",
+    "avatar_id",
+    "is_online",
+    "created_at",
+    "updated_at",
+    "last_activity",
+    "limit",
+    "offset",
+)
+
+
+def normalize_sql(statement: str) -> str:
+    """
+    Текст запроса без литералов: запросы, отличающиеся только
+    значениями и длиной списков IN, получают одинаковый отпечаток
+    """
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _PLACEHOLDER_LIST.sub("(...)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def mask_parameters(
+    names: Optional[Sequence[str]],
+    parameters: Any,
+    sensitive_keys: Sequence[str],
+    safe_parameters: Sequence[str] = SAFE_PARAMETERS,
+) -> dict[str, dict[str, Any]]:
+    """
+    Типы и значения параметров; значения показываются только для
+    параметров из safe_parameters, имена которых не содержат
+    чувствительных ключей
+    """
+    if isinstance(parameters, dict):
+        items = parameters.items()
+    else:
+        names = names or [f"${index}" for index in range(1, len(parameters) + 1)]
+        items = zip(names, parameters)
+
+    shapes = {}
+    for name, value in items:
+        lowered = name.lower()
+        if (
+            _BIND_SUFFIX.sub("", lowered) not in safe_parameters
+            or any(key in lowered for key in sensitive_keys)
+        ):
+            shown = "***"
+        elif value is None:
+            shown = None
+        else:
+            shown = str(value)[:_MAX_VALUE_LENGTH]
+        shapes[name] = {"type": type(value).__name__, "value": shown}
+    return shapes
+
+
+class SlowQueryLog:
+    """
+    Журнал медленных запросов: запись в JSON-лог с нормализованным SQL,
+    замаскированными параметрами и методом репозитория, не чаще одного
+    раза в interval секунд на отпечаток запроса. Для части записей план
+    EXPLAIN (ANALYZE, BUFFERS) снимается в фоне отдельным соединением
+    """
+
+    def __init__(
+        self,
+        threshold: float,
+        interval: float,
+        sensitive_keys: Sequence[str],
+        explain: bool = False,
+        explain_sample_rate: float = 0.1,
+        explain_timeout: float = 10,
+        max_fingerprints: int = 1024,
+    ):
+        self.threshold = threshold
+        self.interval = interval
+        self.sensitive_keys = tuple(key.lower() for key in sensitive_keys)
+        self.explain = explain
+        self.explain_sample_rate = explain_sample_rate
+        self.explain_timeout = explain_timeout
+
+        # fingerprint -> [время последней записи, пропущено с тех пор]
+        self._seen = LRUCache(maxsize=max_fingerprints)
+        self._explaining: set[asyncio.Task] = set()
+
+    def observe(
+        self,
+        engine: AsyncEngine,
+        engine_name: str,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        many: bool,
+        elapsed: float,
+        label: str,
+    ) -> None:
+        # Собственные EXPLAIN журнала не учитываются
+        if elapsed < self.threshold or statement.startswith("EXPLAIN"):
+            return
+        DB_SLOW_QUERIES.labels(label).inc()
+
+        normalized = normalize_sql(statement)
+        fingerprint = hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+        now = time.monotonic()
+        seen = self._seen.get(fingerprint)
+        if seen is not None and now - seen[0] < self.interval:
+            seen[1] += 1
+            return
+        suppressed = seen[1] if seen is not None else 0
+        self._seen.set(fingerprint, [now, 0])
+
+        compiled = getattr(context, "compiled", None)
+        names = getattr(compiled, "positiontup", None)
+        sample = parameters[0] if many and parameters else parameters
+        duration = math.ceil(elapsed * 1000)
+
+        logger.warning(
+            f"Медленный запрос {label} за {duration} мс",
+            extra={
+                "duration": duration,
+                "request_json_fields": {
+                    "db_fingerprint": fingerprint,
+                    "db_statement": normalized,
+                    "db_parameters": mask_parameters(
+                        names=names,
+                        parameters=sample or (),
+                        sensitive_keys=self.sensitive_keys,
+                    ),
+                    "db_executemany": len(parameters) if many else 0,
+                    "db_method": label,
+                    "db_engine": engine_name,
+                    "db_suppressed": suppressed,
+                },
+                "to_mask": True,
+            },
+        )
+
+        if self._should_explain(statement=statement, many=many):
+            task = asyncio.get_running_loop().create_task(
+                self._explain(
+                    engine=engine,
+                    statement=statement,
+                    parameters=parameters,
+                    fingerprint=fingerprint,
+                    label=label,
+                )
+            )
+            self._explaining.add(task)
+            task.add_done_callback(self._explaining.discard)
+
+    def _should_explain(self, statement: str, many: bool) -> bool:
+        # ANALYZE выполняет запрос повторно: только чтение и без блокировок
+        if not self.explain or many or self._explaining:
+            return False
+        if statement.lstrip()[:6].upper() != "SELECT":
+            return False
+        if _LOCKING_CLAUSE.search(statement):
+            return False
+        return random.random() < self.explain_sample_rate
+
+    async def _explain(
+        self,
+        engine: AsyncEngine,
+        statement: str,
+        parameters: Any,
+        fingerprint: str,
+        label: str,
+    ) -> None:
+        try:
+            async with engine.connect() as connection:
+                await connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+                await connection.exec_driver_sql(
+                    f"SET LOCAL statement_timeout = {int(self.explain_timeout * 1000)}"
+                )
+                result = await connection.exec_driver_sql(
+                    f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}",
+                    parameters,
+                )
+                plan = result.scalar_one()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                await connection.rollback()
+        except Exception as exc:
+            logger.warning(msg=f"EXPLAIN failed for {fingerprint}", exc_info=exc)
+            return
+
+        logger.info(
+            f"План медленного запроса {label}",
+            extra={
+                "request_json_fields": {
+                    "db_fingerprint": fingerprint,
+                    "db_method": label,
+                    "db_plan": plan,
+                },
+            },
+        )
@@ -0,0 +1,100 @@
+import logging
+from contextvars import ContextVar
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+logger = logging.getLogger(__name__)
+
+
+class UnitOfWork:
+    """
+    Одна сессия и одна транзакция на запрос, общие для всех репозиториев
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self._after_commit: list[Callable[[], Awaitable[Any]]] = []
+
+    def after_commit(self, callback: Callable[[], Awaitable[Any]]) -> None:
+        self._after_commit.append(callback)
+
+    async def commit(self) -> None:
+        await self.session.commit()
+        for callback in self._after_commit:
+            try:
+                await callback()
+            except Exception as exc:
+                logger.warning(msg="after commit callback failed", exc_info=exc)
+        self._after_commit.clear()
+
+    async def rollback(self) -> None:
+        self._after_commit.clear()
+        await self.session.rollback()
+
+
+unit_of_work_var: ContextVar[Optional[UnitOfWork]] = ContextVar(
+    "unit_of_work", default=None
+)
+
+
+def current_unit_of_work() -> Optional[UnitOfWork]:
+    return unit_of_work_var.get()
+
+
+def current_session() -> AsyncSession:
+    unit_of_work = unit_of_work_var.get()
+    if unit_of_work is None:
+        raise RuntimeError("Сессия базы данных доступна только внутри запроса")
+    return unit_of_work.session
+
+
+class UnitOfWorkMiddleware:
+    """
+    ASGI middleware: открывает сессию на запрос и фиксирует транзакцию
+    перед отправкой ответа. Ответы с кодом >= 400 и исключения
+    приводят к откату
+    """
+
+    def __init__(self, app: ASGIApp, session_factory: sessionmaker):
+        self.app = app
+        self.session_factory = session_factory
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        unit_of_work = UnitOfWork(session=self.session_factory())
+        token = unit_of_work_var.set(unit_of_work)
+        finished = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal finished
+            if message["type"] == "http.response.start" and not finished:
+                finished = True
+                if message["status"] < 400:
+                    await unit_of_work.commit()
+                else:
+                    await unit_of_work.rollback()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            if not finished:
+                finished = True
+                await unit_of_work.rollback()
+            raise
+        finally:
+            await unit_of_work.session.close()
+            unit_of_work_var.reset(token)
@@ -11,6 +11,7 @@ from app.exceptions.routes.handlers import incorrect_auth_code_handler
 from app.exceptions.routes.models import ForbiddenError
 from app.exceptions.routes.models import IncorrectAuthCodeError
 from app.exceptions.routes.models import RepeatedAuthCodeError
+from app.exceptions.routes.models import ServiceOverloadedError
 
 
 def setup_exception_handlers(app: FastAPI) -> FastAPI:
@@ -19,6 +20,7 @@ def setup_exception_handlers(app: FastAPI) -> FastAPI:
     app.add_exception_handler(RepeatedAuthCodeError, incorrect_auth_code_handler)
     app.add_exception_handler(ValidationError, validation_exception_handler)
     app.add_exception_handler(ForbiddenError, forbidden_exception_handler)
+    app.add_exception_handler(ServiceOverloadedError, forbidden_exception_handler)
     app.add_exception_handler(
         RequestValidationError, validation_exception_handler
     )
@@ -17,3 +17,10 @@ class ForbiddenError(Exception):
 
     def __init__(self, detail: str):
         self.detail = detail
+
+
+class ServiceOverloadedError(Exception):
+    code = 503
+
+    def __init__(self, detail: str):
+        self.detail = detail
@@ -0,0 +1,2 @@
+class WarmUpMarker:
+    pass
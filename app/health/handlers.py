@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+from fastapi import Depends
+from starlette.responses import JSONResponse
+
+from app.health.dependencies import WarmUpMarker
+from app.health.warmup import WarmUp
+
+health_router = APIRouter()
+
+
+@health_router.get("/health/live", include_in_schema=False)
+async def live():
+    return JSONResponse({"status": "ok"})
+
+
+@health_router.get("/health/ready", include_in_schema=False)
+async def ready(warmup: WarmUp = Depends(WarmUpMarker)):
+    if not warmup.ready:
+        return JSONResponse({"status": "warming_up"}, status_code=503)
+    return JSONResponse({"status": "ok"})
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import time
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Optional
+
+from cashews import Cache
+from prometheus_client import Gauge
+from prometheus_client import Histogram
+from redis.asyncio import Redis
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import QueuePool
+
+from app.utils.u_agents import get_fingerprint
+from app.v1.reference.registry import ReferenceRegistry
+from app.v1.security.context import PasswordHasher
+from app.v1.security.context import get_password_hash
+
+logger = logging.getLogger(__name__)
+
+WARMUP_READY = Gauge("warmup_ready", "Прогрев завершен, процесс готов к трафику")
+WARMUP_STEP_DURATION = Histogram(
+    "warmup_step_duration_seconds",
+    "Длительность шагов прогрева",
+    ["step"],
+)
+
+SELECT_ONE = text("SELECT 1")
+
+# Типичные клиенты: разбор заполняет кэш и компилирует регулярные выражения
+SAMPLE_USER_AGENTS = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 "
+    "(KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Linux; Android 13; SM-S918B) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/118.0.0.0 Mobile Safari/537.36",
+    "okhttp/4.11.0",
+)
+
+
+class WarmUp:
+    """
+    Прогрев процесса после старта: соединения с базой и redis, справочники,
+    backend bcrypt, разбор User-Agent и схема OpenAPI. Готовность
+    (/health/ready) выставляется только после успеха всех шагов,
+    неудачный прогрев повторяется каждые retry_interval секунд
+    """
+
+    def __init__(
+        self,
+        engines: list[AsyncEngine],
+        redis: Redis,
+        cache: Cache,
+        reference_registry: ReferenceRegistry,
+        password_hasher: PasswordHasher,
+        openapi: Callable[[], Any],
+        db_connections: int,
+        retry_interval: float,
+    ):
+        self.engines = engines
+        self.redis = redis
+        self.cache = cache
+        self.reference_registry = reference_registry
+        self.password_hasher = password_hasher
+        self.openapi = openapi
+        self.db_connections = db_connections
+        self.retry_interval = retry_interval
+
+        self.ready = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        # Обработчики shutdown вызываются, когда сервер уже не принимает
+        # соединения, поэтому трафик отсюда не отвести: это делает
+        # оркестратор до SIGTERM. Готовность снимается для метрики warmup_ready
+        self._set_ready(False)
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        steps: list[tuple[str, Callable[[], Awaitable[None]]]] = [
+            ("database", self._open_connections),
+            ("redis", self._ping_redis),
+            ("reference", self._load_reference),
+            ("bcrypt", self._warm_bcrypt),
+            ("user_agents", self._parse_user_agents),
+            ("openapi", self._build_openapi),
+        ]
+        while steps:
+            failed = []
+            for name, step in steps:
+                started_at = time.perf_counter()
+                try:
+                    await step()
+                except Exception as exc:
+                    logger.warning(msg=f"warm-up step {name} failed", exc_info=exc)
+                    failed.append((name, step))
+                finally:
+                    WARMUP_STEP_DURATION.labels(name).observe(
+                        time.perf_counter() - started_at
+                    )
+            steps = failed
+            if steps:
+                await asyncio.sleep(self.retry_interval)
+
+        self._set_ready(True)
+        logger.info(msg="warm-up finished")
+
+    def _set_ready(self, ready: bool) -> None:
+        self.ready = ready
+        WARMUP_READY.set(int(ready))
+
+    async def _open_connections(self) -> None:
+        for engine in self.engines:
+            pool = engine.sync_engine.pool
+            count = 1
+            if isinstance(pool, QueuePool):
+                count = max(min(self.db_connections, pool.size()), 1)
+
+            # Соединения открываются одновременно и возвращаются в пул вместе,
+            # иначе каждое следующее переиспользовало бы предыдущее
+            results = await asyncio.gather(
+                *(engine.connect().start() for _ in range(count)),
+                return_exceptions=True,
+            )
+            connections = [
+                result for result in results if not isinstance(result, Exception)
+            ]
+            try:
+                for result in results:
+                    if isinstance(result, Exception):
+                        raise result
+                await asyncio.gather(
+                    *(connection.execute(SELECT_ONE) for connection in connections)
+                )
+            finally:
+                for connection in connections:
+                    await connection.close()
+
+    async def _ping_redis(self) -> None:
+        await self.redis.ping()
+        await self.cache.get("v2:health:warmup")
+
+    async def _load_reference(self) -> None:
+        if not self.reference_registry.roles:
+            await self.reference_registry.load()
+
+    async def _warm_bcrypt(self) -> None:
+        # Выбор backend passlib и запуск пула исполнителя
+        await self.password_hasher.run("warmup", get_password_hash, "warmup")
+
+    async def _parse_user_agents(self) -> None:
+        for user_agent in SAMPLE_USER_AGENTS:
+            get_fingerprint(v=user_agent)
+
+    async def _build_openapi(self) -> None:
+        self.openapi()
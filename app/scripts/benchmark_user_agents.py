@@ -0,0 +1,90 @@
+"""
+Стоимость разбора User-Agent: холодный разбор регулярными выражениями
+user_agents против попадания в кэш отпечатков get_fingerprint.
+
+Запуск: python -m app.scripts.benchmark_user_agents
+        [--iterations 2000] [--file user_agents.txt]
+
+Файл (по строке User-Agent на строку) позволяет замерить
+на выгрузке реального трафика вместо встроенной выборки
+"""
+import argparse
+import time
+from typing import Optional
+
+from ua_parser import user_agent_parser
+
+from app.utils.u_agents import _fingerprints
+from app.utils.u_agents import get_fingerprint
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 "
+    "(KHTML, like Gecko) Version/17.0 Safari/605.1.15",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 "
+    "(KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Linux; Android 13; SM-S918B) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/117.0.0.0 Mobile Safari/537.36",
+    "Mozilla/5.0 (iPad; CPU OS 16_6 like Mac OS X) AppleWebKit/605.1.15 "
+    "(KHTML, like Gecko) Version/16.6 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:109.0) Gecko/20100101 Firefox/118.0",
+    "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)",
+    "okhttp/4.11.0",
+    "",
+]
+
+
+def load(path: Optional[str]) -> list[str]:
+    if path is None:
+        return USER_AGENTS
+    with open(path, encoding="utf-8") as file:
+        return [line.rstrip("\n") for line in file]
+
+
+def cold(user_agents: list[str], iterations: int) -> float:
+    started_at = time.perf_counter()
+    for index in range(iterations):
+        # Каждый вызов — промах: перед разбором очищаются и кэш отпечатков,
+        # и собственный кэш разбора ua_parser
+        _fingerprints.clear()
+        user_agent_parser._PARSE_CACHE.clear()
+        get_fingerprint(user_agents[index % len(user_agents)])
+    return (time.perf_counter() - started_at) / iterations
+
+
+def warm(user_agents: list[str], iterations: int) -> float:
+    for user_agent in user_agents:
+        get_fingerprint(user_agent)
+
+    started_at = time.perf_counter()
+    for index in range(iterations):
+        get_fingerprint(user_agents[index % len(user_agents)])
+    return (time.perf_counter() - started_at) / iterations
+
+
+def main(iterations: int, path: Optional[str]) -> None:
+    user_agents = load(path)
+    unique = len(set(user_agents))
+    if unique > _fingerprints.maxsize:
+        print(
+            f"{unique} unique user agents exceed cache size "
+            f"{_fingerprints.maxsize}, warm run will include misses"
+        )
+
+    cold_elapsed = cold(user_agents, iterations)
+    warm_elapsed = warm(user_agents, iterations)
+
+    print(f"{'parse':<10} {'us/call':>10}")
+    print(f"{'cold':<10} {cold_elapsed * 1_000_000:>10.2f}")
+    print(f"{'warm':<10} {warm_elapsed * 1_000_000:>10.2f}")
+    print(f"speedup {cold_elapsed / warm_elapsed:.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--file", default=None)
+    args = parser.parse_args()
+
+    main(iterations=args.iterations, path=args.file)
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+from typing import Union
+
+from app.services.geoip.engine import open_geoip_database
+from app.services.ipwhois.cache import CachedIPWhoisClient
+from app.services.ipwhois.client import IPWhoisClient
+from app.services.ipwhois.models import IPWhoisResponseModel
+
+logger = logging.getLogger(__name__)
+
+
+class GeoIPClient:
+    """
+    Локальное определение местоположения по IP с интерфейсом IPWhoisClient.
+    Файл базы перечитывается при изменении, IPWhois используется
+    как необязательный запасной вариант
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        fallback: Optional[Union[CachedIPWhoisClient, IPWhoisClient]] = None,
+        reload_interval: float = 60,
+    ):
+        self.path = path
+        self.fallback = fallback
+        self.reload_interval = reload_interval
+
+        self.database = None
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._reloading = False
+
+        if path:
+            self._mtime = os.stat(path).st_mtime
+            self.database = open_geoip_database(path)
+            self._checked_at = time.monotonic()
+        elif fallback is None:
+            logger.warning(
+                msg="geoip is disabled: session location will be empty, set "
+                "GEOIP_DATABASE_PATH or GEOIP_IPWHOIS_FALLBACK=true"
+            )
+
+    async def get(self, ip: str) -> IPWhoisResponseModel:
+        await self._reload_if_changed()
+
+        location = None
+        if self.database is not None and ip:
+            try:
+                location = self.database.lookup(ip)
+            except ValueError:
+                return IPWhoisResponseModel(ip=ip, success=False)
+
+        if location is not None:
+            return IPWhoisResponseModel(
+                ip=ip,
+                success=True,
+                type="IPv6" if ":" in ip else "IPv4",
+                country_code=location.country_code,
+                country=location.country,
+                region=location.region,
+                city=location.city,
+            )
+
+        if self.fallback is not None and ip:
+            try:
+                return await self.fallback.get(ip=ip)
+            except Exception as exc:
+                logger.warning(msg="ipwhois fallback failed", exc_info=exc)
+
+        return IPWhoisResponseModel(ip=ip, success=False)
+
+    async def _reload_if_changed(self) -> None:
+        if not self.path or self._reloading:
+            return
+
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError as exc:
+            logger.warning(msg="geoip database is unavailable", exc_info=exc)
+            return
+        if mtime == self._mtime:
+            return
+
+        self._reloading = True
+        try:
+            loop = asyncio.get_running_loop()
+            database = await loop.run_in_executor(
+                None, open_geoip_database, self.path
+            )
+        except Exception as exc:
+            logger.error(msg="geoip database reload failed", exc_info=exc)
+        else:
+            previous, self.database, self._mtime = self.database, database, mtime
+            if hasattr(previous, "close"):
+                previous.close()
+            logger.info(msg=f"geoip database reloaded from {self.path}")
+        finally:
+            self._reloading = False
@@ -0,0 +1,141 @@
+import csv
+import ipaddress
+from array import array
+from typing import Iterable
+from typing import NamedTuple
+from typing import Optional
+
+try:
+    import maxminddb
+except ImportError:  # pragma: no cover
+    maxminddb = None
+
+
+class GeoLocation(NamedTuple):
+    country_code: Optional[str]
+    country: Optional[str]
+    region: Optional[str]
+    city: Optional[str]
+
+
+class RangeTable:
+    """
+    Отсортированные непересекающиеся диапазоны адресов фиксированной ширины.
+    Границы хранятся big-endian в одном bytes-буфере, поэтому сравнение
+    срезов совпадает с числовым сравнением адресов
+    """
+
+    def __init__(self, width: int, ranges: Iterable[tuple[int, int, int]]):
+        self.width = width
+        starts = bytearray()
+        ends = bytearray()
+        self.locations = array("I")
+
+        for start, end, location in sorted(ranges):
+            starts += start.to_bytes(width, "big")
+            ends += end.to_bytes(width, "big")
+            self.locations.append(location)
+
+        self.starts = bytes(starts)
+        self.ends = bytes(ends)
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+    def find(self, key: bytes) -> Optional[int]:
+        width = self.width
+        lo, hi = 0, len(self.locations)
+        # Поиск последнего диапазона с началом <= key
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.starts[mid * width:(mid + 1) * width] <= key:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        index = lo - 1
+        if index < 0 or self.ends[index * width:(index + 1) * width] < key:
+            return None
+        return self.locations[index]
+
+
+class CSVGeoIPDatabase:
+    """
+    База диапазонов из CSV со строками вида
+    start_ip,end_ip,country_code,country,region,city
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.locations: list[GeoLocation] = []
+        location_ids: dict[GeoLocation, int] = {}
+        ranges: dict[int, list[tuple[int, int, int]]] = {4: [], 6: []}
+
+        with open(path, newline="", encoding="utf-8") as file:
+            for row in csv.reader(file):
+                if not row or row[0].startswith("#"):
+                    continue
+                try:
+                    start = ipaddress.ip_address(row[0].strip())
+                    end = ipaddress.ip_address(row[1].strip())
+                except ValueError:
+                    # Заголовок или битая строка
+                    continue
+
+                location = GeoLocation(*(value or None for value in row[2:6]))
+                location_id = location_ids.setdefault(location, len(self.locations))
+                if location_id == len(self.locations):
+                    self.locations.append(location)
+                ranges[start.version].append((int(start), int(end), location_id))
+
+        self.v4 = RangeTable(width=4, ranges=ranges[4])
+        self.v6 = RangeTable(width=16, ranges=ranges[6])
+
+    def lookup(self, ip: str) -> Optional[GeoLocation]:
+        address = ipaddress.ip_address(ip)
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+
+        table = self.v4 if address.version == 4 else self.v6
+        location_id = table.find(address.packed)
+        if location_id is None:
+            return None
+        return self.locations[location_id]
+
+
+class MMDBGeoIPDatabase:
+    """
+    База в формате MaxMind DB, читается через mmap
+    """
+
+    def __init__(self, path: str, locale: str = "en"):
+        if maxminddb is None:
+            raise RuntimeError("Для чтения .mmdb требуется пакет maxminddb")
+
+        self.path = path
+        self.locale = locale
+        self.reader = maxminddb.open_database(path, maxminddb.MODE_MMAP)
+
+    def lookup(self, ip: str) -> Optional[GeoLocation]:
+        record = self.reader.get(ip)
+        if not record:
+            return None
+
+        country = record.get("country") or {}
+        subdivisions = record.get("subdivisions") or [{}]
+        city = record.get("city") or {}
+        return GeoLocation(
+            country_code=country.get("iso_code"),
+            country=(country.get("names") or {}).get(self.locale),
+            region=(subdivisions[0].get("names") or {}).get(self.locale),
+            city=(city.get("names") or {}).get(self.locale),
+        )
+
+    def close(self) -> None:
+        self.reader.close()
+
+
+def open_geoip_database(path: str):
+    if path.endswith(".mmdb"):
+        return MMDBGeoIPDatabase(path=path)
+    return CSVGeoIPDatabase(path=path)
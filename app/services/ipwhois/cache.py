@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from typing import Optional
+
+from cashews import Cache
+from prometheus_client import Counter
+
+from app.services.ipwhois.client import IPWhoisClient
+from app.services.ipwhois.models import IPWhoisResponseModel
+from app.utils.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+IPWHOIS_CACHE_REQUESTS = Counter(
+    "ipwhois_cache_requests_total",
+    "Обращения к кэшу IPWhois",
+    ["tier", "result"],
+)
+IPWHOIS_OUTBOUND_REQUESTS = Counter(
+    "ipwhois_outbound_requests_total",
+    "Исходящие запросы к IPWhois",
+    ["result"],
+)
+
+NEGATIVE = object()
+
+
+class CachedIPWhoisClient:
+    """
+    Кэширование ответов IPWhois: LRU с TTL в памяти процесса,
+    отрицательное кэширование ошибок, объединение одновременных запросов
+    по одному IP и необязательный общий уровень в redis
+    """
+
+    KEY = "v2:ipwhois:{ip}"
+
+    def __init__(
+        self,
+        client: IPWhoisClient,
+        maxsize: int,
+        ttl: float,
+        negative_ttl: float,
+        shared: Optional[Cache] = None,
+    ):
+        self.client = client
+        self.local = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.shared = shared
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    async def get(self, ip: str) -> IPWhoisResponseModel:
+        cached = self.local.get(ip)
+        if cached is NEGATIVE:
+            IPWHOIS_CACHE_REQUESTS.labels("local", "negative_hit").inc()
+            return IPWhoisResponseModel(ip=ip, success=False)
+        if cached is not None:
+            IPWHOIS_CACHE_REQUESTS.labels("local", "hit").inc()
+            return cached
+
+        inflight = self._inflight.get(ip)
+        if inflight is not None:
+            IPWHOIS_CACHE_REQUESTS.labels("local", "coalesced").inc()
+            return await asyncio.shield(inflight)
+
+        IPWHOIS_CACHE_REQUESTS.labels("local", "miss").inc()
+        task = asyncio.ensure_future(self._load(ip))
+        self._inflight[ip] = task
+        task.add_done_callback(lambda _: self._inflight.pop(ip, None))
+        return await asyncio.shield(task)
+
+    async def _load(self, ip: str) -> IPWhoisResponseModel:
+        if self.shared is not None:
+            try:
+                raw = await self.shared.get(self.KEY.format(ip=ip))
+            except Exception as exc:
+                logger.warning(msg="ipwhois shared cache is unavailable", exc_info=exc)
+                raw = None
+
+            if raw is not None:
+                IPWHOIS_CACHE_REQUESTS.labels("redis", "hit").inc()
+                response = IPWhoisResponseModel.parse_raw(raw)
+                self.local.set(ip, response)
+                return response
+            IPWHOIS_CACHE_REQUESTS.labels("redis", "miss").inc()
+
+        try:
+            response = await self.client.get(ip=ip)
+        except Exception as exc:
+            IPWHOIS_OUTBOUND_REQUESTS.labels("error").inc()
+            logger.warning(msg="ipwhois request failed", exc_info=exc)
+            self.local.set(ip, NEGATIVE, ttl=self.negative_ttl)
+            return IPWhoisResponseModel(ip=ip, success=False)
+
+        if response.success is False:
+            # Ответ с success=False (лимит ключа, зарезервированный адрес)
+            # кэшируется как ошибка только локально и на negative_ttl,
+            # иначе пустая геолокация закрепилась бы на весь TTL
+            IPWHOIS_OUTBOUND_REQUESTS.labels("unsuccessful").inc()
+            self.local.set(ip, NEGATIVE, ttl=self.negative_ttl)
+            return response
+
+        IPWHOIS_OUTBOUND_REQUESTS.labels("ok").inc()
+        self.local.set(ip, response)
+        if self.shared is not None:
+            try:
+                await self.shared.set(
+                    self.KEY.format(ip=ip), response.json(), expire=int(self.ttl)
+                )
+            except Exception as exc:
+                logger.warning(msg="ipwhois shared cache is unavailable", exc_info=exc)
+        return response
@@ -0,0 +1,13 @@
+from app.services.outbox.models import OutboxJob
+from app.services.outbox.storage import OutboxStorage
+
+
+class SMSOutbox:
+    def __init__(self, storage: OutboxStorage, provider: str):
+        self.storage = storage
+        self.provider = provider
+
+    async def send(self, phone: str, text: str) -> OutboxJob:
+        job = OutboxJob(provider=self.provider, phone=phone, text=text)
+        await self.storage.enqueue(job)
+        return job
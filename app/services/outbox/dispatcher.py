@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Optional
+
+from prometheus_client import Counter
+from prometheus_client import Gauge
+from prometheus_client import Histogram
+
+from app.services.outbox.models import OutboxJob
+from app.services.outbox.providers import SMSProvider
+from app.services.outbox.providers import TokenBucket
+from app.services.outbox.storage import OutboxStorage
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_QUEUE_SIZE = Gauge(
+    "outbox_queue_size",
+    "Количество задач в очереди outbox",
+)
+OUTBOX_QUEUE_LAG = Histogram(
+    "outbox_queue_lag_seconds",
+    "Время от постановки задачи в очередь до попытки отправки",
+    ["provider"],
+)
+OUTBOX_DELIVERY_LATENCY = Histogram(
+    "outbox_delivery_latency_seconds",
+    "Время отправки сообщения провайдером",
+    ["provider"],
+)
+OUTBOX_DELIVERIES = Counter(
+    "outbox_deliveries_total",
+    "Результаты попыток отправки",
+    ["provider", "result"],
+)
+
+
+class OutboxDispatcher:
+    """
+    Фоновая отправка задач outbox с ограничением параллелизма,
+    повторами с экспоненциальной задержкой и dead-letter очередью
+    """
+
+    def __init__(
+        self,
+        storage: OutboxStorage,
+        providers: list[SMSProvider],
+        rate_limits: dict[str, float],
+        concurrency: int,
+        batch_size: int,
+        poll_interval: float,
+        lease_timeout: float,
+        send_timeout: float,
+        max_attempts: int,
+        backoff_base: float,
+        backoff_max: float,
+    ):
+        self.storage = storage
+        self.providers = {provider.name: provider for provider in providers}
+        self.limiters = {
+            name: TokenBucket(rate=rate) for name, rate in rate_limits.items()
+        }
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_timeout = lease_timeout
+        self.send_timeout = send_timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        self._inflight: set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                claimed = await self._poll()
+            except Exception as exc:
+                logger.error(msg="outbox poll failed", exc_info=exc)
+                claimed = 0
+
+            if len(self._inflight) >= self.concurrency:
+                await asyncio.wait(self._inflight, return_when=asyncio.FIRST_COMPLETED)
+            elif not claimed:
+                try:
+                    await asyncio.wait_for(
+                        self._stopping.wait(), timeout=self.poll_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _poll(self) -> int:
+        OUTBOX_QUEUE_SIZE.set(await self.storage.size())
+
+        free = self.concurrency - len(self._inflight)
+        if free <= 0:
+            return 0
+
+        jobs = await self.storage.claim(
+            limit=min(free, self.batch_size),
+            lease=self.lease_timeout,
+        )
+        for job in jobs:
+            task = asyncio.create_task(self._deliver(job))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+        return len(jobs)
+
+    async def _deliver(self, job: OutboxJob) -> None:
+        provider = self.providers.get(job.provider)
+        if provider is None:
+            job.last_error = f"unknown provider {job.provider}"
+            OUTBOX_DELIVERIES.labels(job.provider, "dead").inc()
+            await self.storage.dead_letter(job)
+            return
+
+        OUTBOX_QUEUE_LAG.labels(provider.name).observe(time.time() - job.created_at)
+        limiter = self.limiters.get(provider.name)
+        if limiter is not None:
+            await limiter.acquire()
+
+        started_at = time.perf_counter()
+        try:
+            await asyncio.wait_for(
+                provider.send(phone=job.phone, text=job.text),
+                timeout=self.send_timeout,
+            )
+        except Exception as exc:
+            await self._handle_failure(job=job, exc=exc)
+        else:
+            OUTBOX_DELIVERY_LATENCY.labels(provider.name).observe(
+                time.perf_counter() - started_at
+            )
+            OUTBOX_DELIVERIES.labels(provider.name, "sent").inc()
+            await self.storage.ack(job)
+
+    async def _handle_failure(self, job: OutboxJob, exc: Exception) -> None:
+        job.attempts += 1
+        job.last_error = repr(exc)
+
+        if job.attempts >= self.max_attempts:
+            logger.error(msg=f"outbox job {job.uuid} dead-lettered", exc_info=exc)
+            OUTBOX_DELIVERIES.labels(job.provider, "dead").inc()
+            await self.storage.dead_letter(job)
+            return
+
+        logger.warning(msg=f"outbox job {job.uuid} failed", exc_info=exc)
+        OUTBOX_DELIVERIES.labels(job.provider, "retry").inc()
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (job.attempts - 1))
+        await self.storage.retry(job, delay=delay * random.uniform(0.5, 1))
@@ -0,0 +1,24 @@
+import time
+from typing import Optional
+from uuid import UUID
+
+from pydantic import BaseModel
+from pydantic import Field
+from uuid_extensions import uuid7
+
+
+class OutboxJob(BaseModel):
+    uuid: UUID = Field(default_factory=uuid7)
+    provider: str
+    phone: str
+    text: str
+    attempts: int = 0
+    created_at: float = Field(default_factory=time.time)
+    last_error: Optional[str] = None
+
+    def redacted(self) -> "OutboxJob":
+        """
+        Копия без текста сообщения: в нем код входа, который
+        не должен храниться в очереди неотправленных
+        """
+        return self.copy(update={"text": "***"})
@@ -0,0 +1,83 @@
+import asyncio
+import random
+import time
+from abc import ABC
+from abc import abstractmethod
+from typing import Optional
+
+from smsaero.client import SMSAero
+
+
+class SMSProvider(ABC):
+    name: str
+
+    @abstractmethod
+    async def send(self, phone: str, text: str) -> None:
+        ...
+
+
+class SMSAeroProvider(SMSProvider):
+    name = "smsaero"
+
+    def __init__(self, client: SMSAero, sign: str = "SMS Aero"):
+        self.client = client
+        self.sign = sign
+
+    async def send(self, phone: str, text: str) -> None:
+        await self.client.sms.send(phone=phone, sign=self.sign, text=text)
+
+
+class FakeSMSProvider(SMSProvider):
+    """
+    Провайдер без сети для локального и нагрузочного тестирования outbox
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        failure_rate: float = 0.0,
+        keep_last: int = 1000,
+    ):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.keep_last = keep_last
+        self.sent: list[tuple[str, str]] = []
+
+    async def send(self, phone: str, text: str) -> None:
+        await asyncio.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            raise ConnectionError("fake provider failure")
+
+        self.sent.append((phone, text))
+        del self.sent[: -self.keep_last]
+
+
+class TokenBucket:
+    """
+    Ограничение частоты обращений к провайдеру: rate запросов в секунду
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst or max(rate, 1)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated_at) * self.rate
+                )
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
@@ -0,0 +1,162 @@
+import heapq
+import itertools
+import time
+from abc import ABC
+from abc import abstractmethod
+from uuid import UUID
+
+from redis.asyncio import Redis
+
+from app.services.outbox.models import OutboxJob
+
+
+class OutboxStorage(ABC):
+    @abstractmethod
+    async def enqueue(self, job: OutboxJob, delay: float = 0) -> None:
+        ...
+
+    @abstractmethod
+    async def claim(self, limit: int, lease: float) -> list[OutboxJob]:
+        """
+        Забрать до limit готовых к отправке задач.
+        Задача невидима для других обработчиков lease секунд,
+        после чего возвращается в очередь, если не была подтверждена
+        """
+
+    @abstractmethod
+    async def ack(self, job: OutboxJob) -> None:
+        ...
+
+    @abstractmethod
+    async def retry(self, job: OutboxJob, delay: float) -> None:
+        ...
+
+    @abstractmethod
+    async def dead_letter(self, job: OutboxJob) -> None:
+        """
+        Убрать задачу из очереди после исчерпания попыток.
+        Хранится только копия без текста сообщения (OutboxJob.redacted)
+        """
+
+    @abstractmethod
+    async def size(self) -> int:
+        ...
+
+
+class RedisOutboxStorage(OutboxStorage):
+    """
+    Устойчивая очередь в redis: sorted set по времени следующей попытки
+    и hash с телами задач
+    """
+
+    SCHEDULED_KEY = "v2:outbox:{queue}:scheduled"
+    JOBS_KEY = "v2:outbox:{queue}:jobs"
+    DEAD_KEY = "v2:outbox:{queue}:dead"
+
+    CLAIM_SCRIPT = """
+    local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+    if #due == 0 then
+        return {}
+    end
+    for _, id in ipairs(due) do
+        redis.call('ZADD', KEYS[1], ARGV[3], id)
+    end
+    return redis.call('HMGET', KEYS[2], unpack(due))
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        queue: str,
+        dead_letter_size: int = 10000,
+        dead_letter_ttl: int = 604800,
+    ):
+        self.redis = redis
+        self.scheduled_key = self.SCHEDULED_KEY.format(queue=queue)
+        self.jobs_key = self.JOBS_KEY.format(queue=queue)
+        self.dead_key = self.DEAD_KEY.format(queue=queue)
+        self.dead_letter_size = dead_letter_size
+        self.dead_letter_ttl = dead_letter_ttl
+        self._claim = redis.register_script(self.CLAIM_SCRIPT)
+
+    async def enqueue(self, job: OutboxJob, delay: float = 0) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.jobs_key, str(job.uuid), job.json())
+            pipe.zadd(self.scheduled_key, {str(job.uuid): time.time() + delay})
+            await pipe.execute()
+
+    async def claim(self, limit: int, lease: float) -> list[OutboxJob]:
+        now = time.time()
+        payloads = await self._claim(
+            keys=[self.scheduled_key, self.jobs_key],
+            args=[now, limit, now + lease],
+        )
+        return [OutboxJob.parse_raw(payload) for payload in payloads if payload]
+
+    async def ack(self, job: OutboxJob) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.scheduled_key, str(job.uuid))
+            pipe.hdel(self.jobs_key, str(job.uuid))
+            await pipe.execute()
+
+    async def retry(self, job: OutboxJob, delay: float) -> None:
+        await self.enqueue(job, delay=delay)
+
+    async def dead_letter(self, job: OutboxJob) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.scheduled_key, str(job.uuid))
+            pipe.hdel(self.jobs_key, str(job.uuid))
+            pipe.lpush(self.dead_key, job.redacted().json())
+            pipe.ltrim(self.dead_key, 0, self.dead_letter_size - 1)
+            pipe.expire(self.dead_key, self.dead_letter_ttl)
+            await pipe.execute()
+
+    async def size(self) -> int:
+        return await self.redis.zcard(self.scheduled_key)
+
+
+class InMemoryOutboxStorage(OutboxStorage):
+    """
+    Очередь в памяти процесса для локального запуска и нагрузочных тестов
+    """
+
+    def __init__(self):
+        self.jobs: dict[UUID, OutboxJob] = {}
+        self.dead: list[OutboxJob] = []
+        self._scheduled: dict[UUID, float] = {}
+        self._heap: list[tuple[float, int, UUID]] = []
+        self._counter = itertools.count()
+
+    def _schedule(self, uuid: UUID, at: float) -> None:
+        self._scheduled[uuid] = at
+        heapq.heappush(self._heap, (at, next(self._counter), uuid))
+
+    async def enqueue(self, job: OutboxJob, delay: float = 0) -> None:
+        self.jobs[job.uuid] = job
+        self._schedule(job.uuid, time.time() + delay)
+
+    async def claim(self, limit: int, lease: float) -> list[OutboxJob]:
+        now = time.time()
+        claimed: list[OutboxJob] = []
+        while self._heap and len(claimed) < limit and self._heap[0][0] <= now:
+            at, _, uuid = heapq.heappop(self._heap)
+            # Пропускаем устаревшие записи кучи после переназначения времени
+            if self._scheduled.get(uuid) != at:
+                continue
+            self._schedule(uuid, now + lease)
+            claimed.append(self.jobs[uuid])
+        return claimed
+
+    async def ack(self, job: OutboxJob) -> None:
+        self.jobs.pop(job.uuid, None)
+        self._scheduled.pop(job.uuid, None)
+
+    async def retry(self, job: OutboxJob, delay: float) -> None:
+        await self.enqueue(job, delay=delay)
+
+    async def dead_letter(self, job: OutboxJob) -> None:
+        await self.ack(job)
+        self.dead.append(job.redacted())
+
+    async def size(self) -> int:
+        return len(self._scheduled)
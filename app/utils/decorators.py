@@ -1,5 +1,7 @@
 from functools import wraps
 
+from app.utils.pagination import Page
+
 
 def standardize_response(status_code: int):
     def decorator(func):
@@ -11,6 +13,9 @@ def standardize_response(status_code: int):
                 "code": status_code,
                 "result": result_func,
             }
+            if isinstance(result_func, Page):
+                response["result"] = result_func.items
+                response["next_cursor"] = result_func.next_cursor
             return response
 
         return wrapper
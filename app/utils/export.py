@@ -0,0 +1,51 @@
+import csv
+import datetime
+import io
+import json
+from typing import Any
+from typing import AsyncIterator
+from typing import Mapping
+from typing import Sequence
+from uuid import UUID
+
+Batch = Sequence[Mapping[str, Any]]
+
+
+def _serialize(value: Any) -> Any:
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not serializable")
+
+
+async def ndjson_chunks(batches: AsyncIterator[Batch]) -> AsyncIterator[bytes]:
+    """
+    Одна строка JSON на запись, один чанк ответа на пачку строк
+    """
+    async for batch in batches:
+        yield "".join(
+            json.dumps(dict(row), default=_serialize, ensure_ascii=False) + "\n"
+            for row in batch
+        ).encode()
+
+
+async def csv_chunks(
+    batches: AsyncIterator[Batch], columns: Sequence[str]
+) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+
+    async for batch in batches:
+        for row in batch:
+            writer.writerow(
+                "" if row[column] is None else row[column] for column in columns
+            )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+    # Заголовок отдается даже для пустой выгрузки
+    if buffer.tell():
+        yield buffer.getvalue().encode()
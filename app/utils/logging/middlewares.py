@@ -20,6 +20,7 @@ from opencensus.trace.propagation import trace_context_http_header_format
 from starlette.middleware.base import RequestResponseEndpoint
 from starlette.types import ASGIApp, Message
 
+from app.db.metrics import collect_query_stats
 from app.utils.logging.json_logger import EMPTY_VALUE
 from app.utils.logging.schemas import RequestJsonLogSchema
 from app.exceptions.cors import handle_custom_500_with_cors
@@ -143,7 +144,8 @@ class LoggingMiddleware:
         request_headers: dict = dict(request.headers.items())
         # Response Side
         try:
-            response = await call_next(request)
+            with collect_query_stats() as query_stats:
+                response = await call_next(request)
         except Exception as ex:
             response_body = bytes(http.HTTPStatus.INTERNAL_SERVER_ERROR.phrase.encode())
             response = handle_custom_500_with_cors(request=request)
@@ -152,14 +154,16 @@ class LoggingMiddleware:
         else:
             response_headers = dict(response.headers.items())
             response_body = b""
-            async for chunk in response.body_iterator:
-                response_body += chunk
-            response = Response(
-                content=response_body,
-                status_code=response.status_code,
-                headers=dict(response.headers),
-                media_type=response.media_type,
-            )
+            # Потоковые выгрузки (NDJSON, CSV) не буферизуются в памяти
+            if response_headers.get("content-type") == "application/json":
+                async for chunk in response.body_iterator:
+                    response_body += chunk
+                response = Response(
+                    content=response_body,
+                    status_code=response.status_code,
+                    headers=dict(response.headers),
+                    media_type=response.media_type,
+                )
         duration: int = math.ceil((time.time() - start_time) * 1000)
 
         response_content_type = response.headers.get("Content-Type", EMPTY_VALUE)
@@ -201,6 +205,8 @@ class LoggingMiddleware:
             if response_size <= 10000
             else request_response_body_large,
             duration=duration,
+            db_query_count=query_stats.count,
+            db_duration=math.ceil(query_stats.duration * 1000),
         ).dict()
         message = (
             f'{"Ошибка" if exception_object else "Ответ"} '
@@ -51,3 +51,5 @@ class RequestJsonLogSchema(BaseModel):
     response_headers: dict
     response_body: Optional[Union[str, dict, list]] = Field(default=None)
     duration: int
+    db_query_count: int = 0
+    db_duration: int = 0
@@ -0,0 +1,13 @@
+from typing import Any
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+
+
+class Page(NamedTuple):
+    """
+    Страница выборки по ключу (keyset): next_cursor - ключ последней записи,
+    None на последней странице
+    """
+    items: List[Any]
+    next_cursor: Optional[Any] = None
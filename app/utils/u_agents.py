@@ -1,11 +1,22 @@
 from enum import Enum
+from typing import NamedTuple
 from typing import Optional
 
+from prometheus_client import Counter
 from user_agents import parse
 from user_agents.parsers import Browser
 from user_agents.parsers import Device
 from user_agents.parsers import OperatingSystem
 
+from app.utils.lru import LRUCache
+from config import settings_cache
+
+USER_AGENT_CACHE_REQUESTS = Counter(
+    "user_agent_cache_requests_total",
+    "Обращения к кэшу разбора User-Agent",
+    ["result"],
+)
+
 
 class UserAgentTypes(str, Enum):
     PC = "PC"
@@ -47,3 +58,42 @@ class UserAgentInformation:
     @property
     def browser(self) -> Browser:
         return self.v.browser
+
+
+class UserAgentFingerprint(NamedTuple):
+    type: Optional[UserAgentTypes]
+    device_brand: Optional[str]
+    device_family: Optional[str]
+    os_family: Optional[str]
+    os_version: Optional[str]
+    browser_family: Optional[str]
+    browser_version: Optional[str]
+
+
+_fingerprints = LRUCache(maxsize=settings_cache.USER_AGENT_SIZE)
+
+
+def get_fingerprint(v: Optional[str]) -> UserAgentFingerprint:
+    """
+    Разбор User-Agent с мемоизацией: regex-разбор выполняется
+    один раз на уникальную строку
+    """
+    v = v or ""
+    fingerprint = _fingerprints.get(v)
+    if fingerprint is not None:
+        USER_AGENT_CACHE_REQUESTS.labels("hit").inc()
+        return fingerprint
+
+    USER_AGENT_CACHE_REQUESTS.labels("miss").inc()
+    information = UserAgentInformation(v=v)
+    fingerprint = UserAgentFingerprint(
+        type=information.type,
+        device_brand=information.device.brand,
+        device_family=information.device.family,
+        os_family=information.os.family,
+        os_version=information.os.version_string,
+        browser_family=information.browser.family,
+        browser_version=information.browser.version_string,
+    )
+    _fingerprints.set(v, fingerprint)
+    return fingerprint
@@ -1,5 +1,6 @@
 from fastapi import APIRouter
 from fastapi import Depends
+from fastapi import FastAPI
 from fastapi.openapi.utils import get_openapi
 
 from starlette.requests import Request
@@ -24,14 +25,20 @@ async def docs_handler(
     _: str = Depends(get_username_http_auth),
     settings_base: Settings = Depends(BaseSettingsMarker),
 ):
-    if request.app.openapi_schema:
-        return request.app.openapi_schema
+    return build_openapi(app=request.app, version=settings_base.APP_VERSION)
 
-    open_api = get_openapi(
+
+def build_openapi(app: FastAPI, version: str) -> dict:
+    """
+    Схема строится один раз на процесс, при прогреве или первом запросе
+    """
+    if app.openapi_schema:
+        return app.openapi_schema
+
+    app.openapi_schema = get_openapi(
         title="CapiMessanger Microservice",
-        version=settings_base.APP_VERSION,
-        routes=request.app.routes,
+        version=version,
+        routes=app.routes,
         servers=[{"url": "/api/v1"}],
     )
-    request.app.openapi_schema = open_api
-    return request.app.openapi_schema
+    return app.openapi_schema
@@ -0,0 +1,194 @@
+import asyncio
+import logging
+from contextlib import suppress
+from typing import NamedTuple
+from typing import Optional
+
+from prometheus_client import Counter
+from prometheus_client import Gauge
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.db.models import Role
+from app.db.models import Statuses
+from app.v1.security.utils import PERMISSIONS
+from app.v1.security.utils import Permission
+from app.v1.security.utils import has_role
+from app.v1.security.utils import role_mask
+from config import settings_app
+from misc import engine
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_REFRESHES = Counter(
+    "reference_registry_refreshes_total",
+    "Перезагрузки справочников ролей и статусов",
+    ["trigger", "result"],
+)
+REFERENCE_LISTENING = Gauge(
+    "reference_registry_listening",
+    "Подписка реестра справочников на NOTIFY активна",
+)
+
+
+class Reference(NamedTuple):
+    id: int
+    title: str
+
+
+class ReferenceRegistry:
+    """
+    Роли, статусы и битовые маски прав в памяти процесса.
+    Загружаются при старте и перечитываются по таймеру
+    или по NOTIFY в канал channel
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        refresh_interval: float,
+        channel: Optional[str] = None,
+    ):
+        self.engine = engine
+        self.refresh_interval = refresh_interval
+        self.channel = channel
+
+        self.roles: dict[int, Reference] = {}
+        self.statuses: dict[int, Reference] = {}
+        self.masks: dict[Permission, dict[int, int]] = {}
+
+        self._task: Optional[asyncio.Task] = None
+        self._listener: Optional[AsyncConnection] = None
+        self._refresh = asyncio.Event()
+
+    def role(self, role_id: Optional[int]) -> Optional[Reference]:
+        return self.roles.get(role_id)
+
+    def status(self, status_id: Optional[int]) -> Optional[Reference]:
+        return self.statuses.get(status_id)
+
+    def allows(
+        self,
+        permission: Permission,
+        role_id: Optional[int],
+        target_role_id: Optional[int],
+    ) -> bool:
+        mask = self.masks.get(permission, {}).get(role_id, 0)
+        return has_role(mask, target_role_id)
+
+    def allows_all(self, permission: Permission, role_id: Optional[int]) -> bool:
+        """
+        Право распространяется на все роли справочника:
+        проверять роль каждой записи не нужно
+        """
+        mask = self.masks.get(permission, {}).get(role_id, 0)
+        return bool(self.roles) and all(has_role(mask, role) for role in self.roles)
+
+    async def load(self) -> None:
+        async with self.engine.connect() as connection:
+            roles = await connection.execute(select(Role.id, Role.title))
+            statuses = await connection.execute(select(Statuses.id, Statuses.title))
+            roles = {row.id: Reference(*row) for row in roles}
+            statuses = {row.id: Reference(*row) for row in statuses}
+
+        # Права только для ролей, которые есть в базе
+        masks = {
+            permission: {
+                role: role_mask(target for target in targets if target in roles)
+                for role, targets in matrix.items()
+                if role in roles
+            }
+            for permission, matrix in PERMISSIONS.items()
+        }
+        self.roles, self.statuses, self.masks = roles, statuses, masks
+
+    async def start(self) -> None:
+        # Недоступная база не должна ронять старт: загрузку повторят
+        # прогрев и таймер, а /health/ready до тех пор не пропустит трафик
+        try:
+            await self.load()
+        except Exception as exc:
+            logger.warning(msg="reference registry load failed", exc_info=exc)
+        await self._ensure_listener()
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._listener is not None:
+            await self._listener.close()
+            self._listener = None
+        REFERENCE_LISTENING.set(0)
+
+    async def _ensure_listener(self) -> None:
+        """
+        Подписка на NOTIFY, если ее нет или соединение оборвалось.
+        Повторяется при каждой перезагрузке справочников
+        """
+        if not self.channel:
+            return
+
+        if self._listener is not None:
+            try:
+                raw_connection = await self._listener.get_raw_connection()
+                closed = raw_connection.driver_connection.is_closed()
+            except Exception:
+                closed = True
+            if not closed:
+                return
+            logger.warning(msg="reference notifications connection is lost")
+            with suppress(Exception):
+                await self._listener.invalidate()
+                await self._listener.close()
+            self._listener = None
+
+        try:
+            await self._listen()
+        except Exception as exc:
+            logger.warning(msg="reference notifications are unavailable", exc_info=exc)
+        REFERENCE_LISTENING.set(1 if self._listener is not None else 0)
+
+    async def _listen(self) -> None:
+        listener = await self.engine.connect()
+        try:
+            raw_connection = await listener.get_raw_connection()
+            await raw_connection.driver_connection.add_listener(
+                self.channel, lambda *_: self._refresh.set()
+            )
+        except BaseException:
+            await listener.close()
+            raise
+        self._listener = listener
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            trigger = "notify"
+            try:
+                await asyncio.wait_for(
+                    self._refresh.wait(), timeout=self.refresh_interval
+                )
+            except asyncio.TimeoutError:
+                trigger = "interval"
+            self._refresh.clear()
+            # Уведомления, пропущенные без подписки, покрывает load ниже
+            await self._ensure_listener()
+
+            try:
+                await self.load()
+            except Exception as exc:
+                REFERENCE_REFRESHES.labels(trigger, "error").inc()
+                logger.warning(msg="reference registry refresh failed", exc_info=exc)
+            else:
+                REFERENCE_REFRESHES.labels(trigger, "ok").inc()
+
+
+reference_registry = ReferenceRegistry(
+    engine=engine,
+    refresh_interval=settings_app.REFERENCE_REFRESH_INTERVAL,
+    # LISTEN требует сессионного соединения, через PgBouncer только таймер
+    channel=(
+        None if settings_app.DB_POOLER_MODE else settings_app.REFERENCE_NOTIFY_CHANNEL
+    ),
+)
@@ -0,0 +1,28 @@
+from typing import Any
+
+from pydantic.utils import GetterDict
+
+from app.v1.reference.registry import reference_registry
+from app.v1.schemas.base import BaseModelORM
+
+
+class ReferenceGetterDict(GetterDict):
+    """
+    Роль и статус берутся из реестра справочников по role_id и status_id,
+    а не из ORM-связей: запросу не нужен join со справочными таблицами
+    """
+
+    # Поле модели -> атрибут ORM-объекта, из которого оно вычисляется
+    sources = {"role": "role_id", "status": "status_id"}
+    resolvers = {"role": reference_registry.role, "status": reference_registry.status}
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        source = self.sources.get(key)
+        if source is None:
+            return super().get(key, default)
+        return self.resolvers[key](getattr(self._obj, source, None))
+
+
+class ReferenceModelORM(BaseModelORM):
+    class Config:
+        getter_dict = ReferenceGetterDict
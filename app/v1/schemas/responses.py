@@ -1,6 +1,7 @@
 from typing import Generic
 from typing import Optional
 from typing import TypeVar
+from uuid import UUID
 
 from pydantic.generics import GenericModel
 
@@ -26,3 +27,7 @@ class BaseResponse(GenericModel, BaseModelORM, Generic[ChildT]):
     code: int = 200
     error: Optional[BaseError]
     result: Optional[ChildT] = None
+
+
+class PageResponse(BaseResponse[ChildT], Generic[ChildT]):
+    next_cursor: Optional[UUID] = None
@@ -16,15 +16,21 @@ from starlette import status as starlette_status
 
 from app.db.models import User
 from app.exceptions.routes.models import ForbiddenError
-from app.v1.security.context import verify_password
+from app.v1.reference.registry import reference_registry
+from app.v1.security.cache import principal_cache
+from app.v1.security.context import verify_password_async
 from app.v1.security.schemas import SystemUserSessionModel
+from app.v1.security.utils import has_role
+from app.v1.security.utils import role_mask
 from app.v1.statuses.enums import StatusEnum
 from app.v1.users.dependencies import UsersDependencyMarker
+from app.v1.users.enums import RoleEnum
+from app.v1.users.schemas import CurrentUserPrincipal
 from app.v1.users.schemas import GetCurrentUserModel
-from app.v1.users.schemas import RoleEnum
+from app.v1.users.schemas import RoleDTO
 from app.v1.users.services import UserService
 from config import settings_app
-from misc import cache
+from misc import replica_router
 
 JWTPayloadMapping = MutableMapping[
     str, Union[datetime, bool, str, List[str], List[int]]
@@ -59,16 +65,16 @@ async def authenticate(
     if not user:
         raise credentials_exception
 
-    if not verify_password(password, user.password):
+    if not await verify_password_async(password, user.password):
         raise credentials_exception
     return user
 
 
-def create_access_token(*, user: User, session: UUID) -> str:
+def create_access_token(*, user_uuid: UUID, session: UUID) -> str:
     return _create_token(
         token_type="access_token",
         lifetime=timedelta(minutes=settings_app.JWT_ACCESS_TOKEN_EXPIRE_MINUTES),
-        sub=str(user.uuid),
+        sub=str(user_uuid),
         session=str(session),
     )
 
@@ -140,32 +146,47 @@ class GetCurrentUser:
     ):
         self.status = status or [StatusEnum.ACTIVE]
         self.role = role or [RoleEnum.USER, RoleEnum.ADMIN, RoleEnum.MODERATOR]
+        self.role_mask = role_mask(self.role)
 
-    # @cache.hit(
-    #     ttl=timedelta(minutes=10),
-    #     cache_hits=100,
-    #     update_after=50,
-    #     key="users:get_current:user_uuid:{token.user_uuid}:session_uuid:{token.session_uuid}",
-    #     prefix="v2",
-    # )
     async def __call__(
         self,
         user_service: UserService = Depends(UsersDependencyMarker),
         token: SystemUserSessionModel = Depends(dependency=depends_jwt),
     ) -> GetCurrentUserModel:
-        user_db = await user_service.get_one_from_uuid(
-            uuid=token.user_uuid,
-            author_uuid=token.user_uuid
+        await replica_router.track_user(user_uuid=token.user_uuid)
+        principal = await principal_cache.get(
+            user_uuid=token.user_uuid,
+            session_uuid=token.session_uuid,
         )
-        if user_db is None:
-            raise credentials_exception
-
-        if user_db.status_id not in self.status:
+        if principal is None:
+            user_db = await user_service.get_principal_row(uuid=token.user_uuid)
+            if user_db is None:
+                raise credentials_exception
+
+            principal = CurrentUserPrincipal(
+                status_id=user_db.status_id,
+                role_id=user_db.role_id,
+                user=GetCurrentUserModel.from_orm(user_db),
+            )
+            # Роль, которой еще нет в реестре (он пуст или устарел),
+            # не кэшируется: иначе ответ без роли жил бы весь TTL
+            if user_db.role_id is None or reference_registry.role(user_db.role_id):
+                await principal_cache.set(
+                    user_uuid=token.user_uuid,
+                    session_uuid=token.session_uuid,
+                    principal=principal,
+                )
+
+        if principal.status_id not in self.status:
             raise account_disabled
 
-        if user_db.role.id not in self.role:
+        if not has_role(self.role_mask, principal.role_id):
             raise ForbiddenError("Недостаточно прав на выполнение данной операции")
 
-        result = GetCurrentUserModel.from_orm(user_db)
-        result.session_id = token.session_uuid
-        return result
+        role = reference_registry.role(principal.role_id)
+        return principal.user.copy(
+            update={
+                "role": RoleDTO.from_orm(role) if role is not None else None,
+                "session_id": token.session_uuid,
+            }
+        )
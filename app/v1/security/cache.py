@@ -0,0 +1,114 @@
+import logging
+from typing import Optional
+from uuid import UUID
+
+from cashews import Cache
+from prometheus_client import Counter
+
+from app.db.uow import current_unit_of_work
+from app.utils.lru import LRUCache
+from app.v1.users.schemas import CurrentUserPrincipal
+from config import settings_cache
+from misc import cache
+
+logger = logging.getLogger(__name__)
+
+PRINCIPAL_CACHE_REQUESTS = Counter(
+    "principal_cache_requests_total",
+    "Обращения к кэшу текущего пользователя",
+    ["tier", "result"],
+)
+PRINCIPAL_CACHE_INVALIDATIONS = Counter(
+    "principal_cache_invalidations_total",
+    "Инвалидации кэша текущего пользователя",
+    ["scope"],
+)
+
+
+class PrincipalCache:
+    """
+    Двухуровневый кэш сущности текущего пользователя:
+    внутрипроцессный LRU с коротким TTL перед общим кэшем в redis
+    """
+
+    KEY = "v3:users:get_current:user_uuid:{user_uuid}:session_uuid:{session_uuid}"
+    USER_PATTERN = "v3:users:get_current:user_uuid:{user_uuid}:*"
+
+    def __init__(
+        self,
+        shared: Cache,
+        local_size: int,
+        local_ttl: float,
+        ttl: int,
+    ):
+        self.shared = shared
+        self.local = LRUCache(maxsize=local_size, ttl=local_ttl)
+        self.ttl = ttl
+
+    async def get(
+        self, user_uuid: UUID, session_uuid: UUID
+    ) -> Optional[CurrentUserPrincipal]:
+        principal = self.local.get((user_uuid, session_uuid))
+        if principal is not None:
+            PRINCIPAL_CACHE_REQUESTS.labels("local", "hit").inc()
+            return principal
+        PRINCIPAL_CACHE_REQUESTS.labels("local", "miss").inc()
+
+        try:
+            raw = await self.shared.get(
+                self.KEY.format(user_uuid=user_uuid, session_uuid=session_uuid)
+            )
+        except Exception as exc:
+            logger.warning(msg="principal cache is unavailable", exc_info=exc)
+            raw = None
+
+        if raw is None:
+            PRINCIPAL_CACHE_REQUESTS.labels("redis", "miss").inc()
+            return None
+
+        PRINCIPAL_CACHE_REQUESTS.labels("redis", "hit").inc()
+        principal = CurrentUserPrincipal.parse_raw(raw)
+        self.local.set((user_uuid, session_uuid), principal)
+        return principal
+
+    async def set(
+        self,
+        user_uuid: UUID,
+        session_uuid: UUID,
+        principal: CurrentUserPrincipal,
+    ) -> None:
+        self.local.set((user_uuid, session_uuid), principal)
+        try:
+            await self.shared.set(
+                self.KEY.format(user_uuid=user_uuid, session_uuid=session_uuid),
+                principal.json(),
+                expire=self.ttl,
+            )
+        except Exception as exc:
+            logger.warning(msg="principal cache is unavailable", exc_info=exc)
+
+    async def invalidate_user(self, user_uuid: UUID) -> None:
+        await self._invalidate_user(user_uuid=user_uuid)
+        # Повтор после фиксации транзакции запроса: параллельный запрос
+        # мог успеть закэшировать еще не зафиксированное состояние
+        unit_of_work = current_unit_of_work()
+        if unit_of_work is not None:
+            unit_of_work.after_commit(lambda: self._invalidate_user(user_uuid))
+
+    async def _invalidate_user(self, user_uuid: UUID) -> None:
+        PRINCIPAL_CACHE_INVALIDATIONS.labels("user").inc()
+        self.local.pop_where(lambda key: key[0] == user_uuid)
+        try:
+            await self.shared.delete_match(
+                self.USER_PATTERN.format(user_uuid=user_uuid)
+            )
+        except Exception as exc:
+            logger.warning(msg="principal cache is unavailable", exc_info=exc)
+
+
+principal_cache = PrincipalCache(
+    shared=cache,
+    local_size=settings_cache.PRINCIPAL_LOCAL_SIZE,
+    local_ttl=settings_cache.PRINCIPAL_LOCAL_TTL,
+    ttl=settings_cache.PRINCIPAL_TTL,
+)
@@ -1,8 +1,31 @@
+import asyncio
+import time
+from concurrent.futures import Executor
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from typing import Callable
+from typing import Optional
+
 from passlib.context import CryptContext
+from prometheus_client import Gauge
+from prometheus_client import Histogram
 
+from app.exceptions.routes.models import ServiceOverloadedError
+from config import settings_app
 
 PWD_CONTEXT = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+PASSWORD_HASHING_QUEUE_DEPTH = Gauge(
+    "password_hashing_queue_depth",
+    "Количество операций bcrypt в очереди и в работе",
+)
+PASSWORD_HASHING_LATENCY = Histogram(
+    "password_hashing_latency_seconds",
+    "Время выполнения операций bcrypt с учетом ожидания в очереди",
+    ["operation"],
+)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return PWD_CONTEXT.verify(secret=plain_password, hash=hashed_password)
@@ -10,3 +33,99 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     return PWD_CONTEXT.hash(secret=password)
+
+
+class PasswordHasher:
+    """
+    Выполнение bcrypt вне event loop в ограниченном пуле потоков или процессов
+    """
+
+    def __init__(
+        self,
+        executor: str,
+        max_workers: int,
+        queue_size: int,
+        timeout: float,
+    ):
+        self.executor_type = executor
+        self.max_workers = max_workers
+        self.limit = max_workers + queue_size
+        self.timeout = timeout
+
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="password-hashing",
+                )
+        return self._executor
+
+    async def run(self, operation: str, func: Callable[..., Any], *args: Any) -> Any:
+        if self._pending >= self.limit:
+            raise ServiceOverloadedError(
+                detail="Сервис перегружен, повторите попытку позже"
+            )
+
+        loop = asyncio.get_running_loop()
+        started_at = time.perf_counter()
+        future = self.executor.submit(func, *args)
+        self._pending += 1
+        PASSWORD_HASHING_QUEUE_DEPTH.inc()
+        # Слот освобождается, когда задача завершилась в исполнителе,
+        # а не когда вызывающий перестал ждать: bcrypt после таймаута
+        # продолжает работать и должен учитываться в лимите
+        future.add_done_callback(lambda _: self._release_soon(loop))
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            raise ServiceOverloadedError(
+                detail="Сервис перегружен, повторите попытку позже"
+            )
+        finally:
+            PASSWORD_HASHING_LATENCY.labels(operation).observe(
+                time.perf_counter() - started_at
+            )
+
+    def _release_soon(self, loop: asyncio.AbstractEventLoop) -> None:
+        # Вызывается в потоке исполнителя: loop мог закрыться в любой момент,
+        # тогда считать слоты уже некому
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            pass
+
+    def _release(self) -> None:
+        self._pending -= 1
+        PASSWORD_HASHING_QUEUE_DEPTH.dec()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    executor=settings_app.PASSWORD_HASHING_EXECUTOR,
+    max_workers=settings_app.PASSWORD_HASHING_WORKERS,
+    queue_size=settings_app.PASSWORD_HASHING_QUEUE_SIZE,
+    timeout=settings_app.PASSWORD_HASHING_TIMEOUT,
+)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.run(
+        "verify", verify_password, plain_password, hashed_password
+    )
+
+
+async def hash_password_async(password: str) -> str:
+    return await password_hasher.run("hash", get_password_hash, password)
@@ -8,6 +8,7 @@ from pyfa_converter import PyFaDepends
 from starlette.requests import Request
 
 from app.db.models import SessionTypeEnum
+from app.exceptions.db.exceptions import handle_not_found_error
 from app.exceptions.routes.models import IncorrectAuthCodeError
 from app.exceptions.routes.models import RepeatedAuthCodeError
 from app.utils.decorators import standardize_response
@@ -16,6 +17,7 @@ from app.v1.security.auth import GetCurrentUser
 from app.v1.security.auth import authenticate
 from app.v1.security.auth import create_access_token
 from app.v1.security.dependencies import UserSessionDependencyMarker
+from app.v1.security.schemas import ConsumeCodeStatus
 from app.v1.security.schemas import GetAccessTokenModel
 from app.v1.security.schemas import GetSession
 from app.v1.security.schemas import OAuth2PhonePasswordRequestForm
@@ -77,7 +79,6 @@ async def login(
     response_model=GetAccessTokenModel,
 )
 async def login(
-    user_service: UserService = Depends(UsersDependencyMarker),
     user_session_service: UserSessionService = Depends(UserSessionDependencyMarker),
     form_data: OAuth2SessionCode = PyFaDepends(OAuth2SessionCode, _type=Form),
 ):
@@ -89,37 +90,35 @@ async def login(
 
     В случае успешной авторизации отправляется access_token
     """
-    session = await user_session_service.get(uuid=form_data.session_id)
-
-    print(f"{session=}")
-    if session.code == form_data.code:
-        if session.status_id == 3:
-            await user_session_service.activate_code(uuid=form_data.session_id)
-            user = await user_service.get_one_from_uuid(
-                uuid=session.user_id,
-                author_uuid=session.user_id,
-            )
-
-            await user_service.activate(uuid=user.uuid)
-
-            access_token = create_access_token(user=user, session=session.uuid)
-
-            result = {
-                "access_token": access_token,
-                "token_type": "bearer",
-                "user_uuid": user.uuid,
-            }
-            return result
-        else:
-            raise RepeatedAuthCodeError(
-                detail="Re-authentication detected. "
-                "You have already entered this verification code on this device."
-            )
-    else:
+    result = await user_session_service.verify(
+        uuid=form_data.session_id,
+        code=form_data.code,
+    )
+
+    if result.status == ConsumeCodeStatus.NOT_FOUND:
+        handle_not_found_error()
+
+    if result.status == ConsumeCodeStatus.WRONG_CODE:
         raise IncorrectAuthCodeError(
             detail="The verification code was entered incorrectly."
         )
 
+    if result.status == ConsumeCodeStatus.ALREADY_USED:
+        raise RepeatedAuthCodeError(
+            detail="Re-authentication detected. "
+            "You have already entered this verification code on this device."
+        )
+
+    access_token = create_access_token(
+        user_uuid=result.user_id,
+        session=result.session_id,
+    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "user_uuid": result.user_id,
+    }
+
 
 @security_router.get(
     "/auth/me",
@@ -153,4 +152,4 @@ async def get_auth_sessions(
     """
     Получить сущность текущего авторизованного пользователя
     """
-    return await user_session_service.repo.get_all(uuid=current_user.uuid)
+    return await user_session_service.repo.get_all_rows(uuid=current_user.uuid)
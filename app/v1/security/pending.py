@@ -0,0 +1,112 @@
+from uuid import UUID
+
+from cashews import Cache
+from uuid_extensions import uuid7
+
+from app.db.models import SessionTypeEnum
+from app.v1.security.repo import UserSessionRepository
+from app.v1.security.schemas import ConsumeCodeResult
+from app.v1.security.schemas import ConsumeCodeStatus
+from app.v1.security.schemas import PendingSessionModel
+
+
+class RedisPendingSessionRepository:
+    """
+    Хранение неподтвержденных сессий в redis с TTL.
+    В Postgres сессия и устройство записываются только после ввода верного кода
+    """
+
+    KEY = "v2:sessions:pending:{uuid}"
+    ATTEMPTS_KEY = "v2:sessions:pending:{uuid}:attempts"
+    CONSUMED_KEY = "v2:sessions:pending:{uuid}:consumed"
+
+    def __init__(
+        self,
+        cache: Cache,
+        repo: UserSessionRepository,
+        ttl: int,
+        max_attempts: int,
+    ):
+        self.cache = cache
+        self.repo = repo
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+
+    async def create(
+        self,
+        user_uuid: UUID,
+        code: str,
+        device_type: str,
+        device_brand: str,
+        device_family: str,
+        os_family: str,
+        os_version: str,
+        browser_family: str,
+        browser_version: str,
+        ip: str,
+        country: str,
+        city: str,
+        session_type: SessionTypeEnum,
+    ) -> PendingSessionModel:
+        pending = PendingSessionModel(
+            uuid=uuid7(),
+            user_id=user_uuid,
+            code=code,
+            session_type=session_type,
+            device_type=device_type,
+            device_brand=device_brand,
+            device_family=device_family,
+            os_family=os_family,
+            os_version=os_version,
+            browser_family=browser_family,
+            browser_version=browser_version,
+            ip=ip,
+            country=country,
+            city=city,
+        )
+        await self.cache.set(
+            self.KEY.format(uuid=pending.uuid), pending.json(), expire=self.ttl
+        )
+        return pending
+
+    async def consume_code(self, uuid: UUID, code: str) -> ConsumeCodeResult:
+        key = self.KEY.format(uuid=uuid)
+        consumed_key = self.CONSUMED_KEY.format(uuid=uuid)
+
+        raw = await self.cache.get(key)
+        if raw is None:
+            if await self.cache.get(consumed_key):
+                return ConsumeCodeResult(status=ConsumeCodeStatus.ALREADY_USED)
+            return ConsumeCodeResult(status=ConsumeCodeStatus.NOT_FOUND)
+
+        pending = PendingSessionModel.parse_raw(raw)
+        if pending.code != code:
+            await self._register_attempt(uuid=uuid)
+            return ConsumeCodeResult(status=ConsumeCodeStatus.WRONG_CODE)
+
+        # SET NX: из параллельных запросов с верным кодом проходит только один
+        if not await self.cache.set_lock(consumed_key, "1", expire=self.ttl):
+            return ConsumeCodeResult(
+                status=ConsumeCodeStatus.ALREADY_USED,
+                user_id=pending.user_id,
+            )
+
+        try:
+            result = await self.repo.create_verified(pending=pending)
+        except Exception:
+            await self.cache.delete(consumed_key)
+            raise
+
+        await self.cache.delete(key)
+        await self.cache.delete(self.ATTEMPTS_KEY.format(uuid=uuid))
+        return result
+
+    async def _register_attempt(self, uuid: UUID) -> None:
+        attempts_key = self.ATTEMPTS_KEY.format(uuid=uuid)
+        attempts = await self.cache.incr(attempts_key)
+        if attempts == 1:
+            await self.cache.expire(attempts_key, self.ttl)
+
+        if attempts >= self.max_attempts:
+            await self.cache.delete(self.KEY.format(uuid=uuid))
+            await self.cache.delete(attempts_key)
@@ -1,51 +1,96 @@
+from typing import Optional
+from typing import Union
 from uuid import UUID
 
+from sqlalchemy import literal
 from sqlalchemy import select
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm import subqueryload
+from sqlalchemy.sql.selectable import CTE
+from uuid_extensions import uuid7
 
 from app.db.crud.base import BaseCRUD
+from app.db.crud.raw import RawCRUD
 from app.db.decorators import orm_error_handler
+from app.db.decorators import read_replica
 from app.db.models import SessionDevice
 from app.db.models import SessionTypeEnum
+from app.db.models import User
 from app.db.models import UserSession
+from app.db.routing import mark_written
+from app.v1.security.rows import SessionRow
+from app.v1.security.schemas import ConsumeCodeResult
+from app.v1.security.schemas import ConsumeCodeStatus
+from app.v1.security.schemas import PendingSessionModel
+from app.v1.security.utils import make_device_fingerprint
+from app.v1.statuses.enums import StatusEnum
+
+SESSION_ROWS_QUERY = """
+    SELECT s.uuid, s.status_id, d.uuid AS device_uuid,
+           d.device_type, d.device_brand, d.device_family,
+           d.os_family, d.os_version, d.browser_family, d.browser_version,
+           d.ip, d.country, d.city
+    FROM users_sessions s
+    JOIN sessions_devices d ON d.uuid = s.device_id
+    WHERE s.user_id = $1
+"""
 
 
 class UserSessionRepository:
-    def __init__(self, db_session: sessionmaker):
+    def __init__(self, db_session: Union[sessionmaker, AsyncSession]):
         self.db_session = db_session
         self.model = UserSession
 
         self.base = BaseCRUD(db_session=db_session, model=self.model)
+        self.raw = RawCRUD(session=self.base.session)
+
+    def _upsert_device(self, **device: Optional[str]) -> CTE:
+        """
+        INSERT ... ON CONFLICT по отпечатку устройства: повторный вход
+        с того же устройства переиспользует существующую запись
+        """
+        stmt = insert(SessionDevice).values(
+            uuid=uuid7(),
+            fingerprint=make_device_fingerprint(**device),
+            **device,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[SessionDevice.fingerprint],
+            set_={"ip": stmt.excluded.ip},
+        ).returning(SessionDevice.uuid)
+        return stmt.cte("device")
 
-    async def create_device(
+    async def _insert_session(
         self,
-        device_type: str,
-        device_brand: str,
-        device_family: str,
-        os_family: str,
-        os_version: str,
-        browser_family: str,
-        browser_version: str,
-        ip: str,
-        country: str,
-        city: str,
-    ) -> SessionDevice:
-        model = SessionDevice(
-            device_type=device_type,
-            device_brand=device_brand,
-            device_family=device_family,
-            os_family=os_family,
-            os_version=os_version,
-            browser_family=browser_family,
-            browser_version=browser_version,
-            ip=ip,
-            country=country,
-            city=city,
+        transaction: AsyncSession,
+        uuid: UUID,
+        user_uuid: UUID,
+        code: str,
+        session_type: SessionTypeEnum,
+        status_id: int,
+        **device: Optional[str],
+    ) -> UserSession:
+        device_cte = self._upsert_device(**device)
+        stmt = (
+            insert(self.model)
+            .from_select(
+                ["uuid", "user_id", "device_id", "code", "session_type", "status_id"],
+                select(
+                    literal(uuid, self.model.uuid.type),
+                    literal(user_uuid, self.model.user_id.type),
+                    device_cte.c.uuid,
+                    literal(code, self.model.code.type),
+                    literal(session_type, self.model.session_type.type),
+                    literal(status_id, self.model.status_id.type),
+                ),
+            )
+            .returning(self.model)
         )
-        self.base.session.add(model)
-        await self.base.session.flush()
-        return model
+        cur = await transaction.execute(select(self.model).from_statement(stmt))
+        return cur.scalar_one()
 
     @orm_error_handler
     async def create(
@@ -65,7 +110,13 @@ class UserSessionRepository:
         session_type: SessionTypeEnum,
     ) -> UserSession:
         async with self.base.transaction_v2() as transaction:
-            device = await self.create_device(
+            session = await self._insert_session(
+                transaction=transaction,
+                uuid=uuid7(),
+                user_uuid=user_uuid,
+                code=code,
+                session_type=session_type,
+                status_id=StatusEnum.NOT_ACTIVE,
                 device_type=device_type,
                 device_brand=device_brand,
                 device_family=device_family,
@@ -77,21 +128,17 @@ class UserSessionRepository:
                 country=country,
                 city=city,
             )
-            session = await self.base.insert(
-                user_id=user_uuid,
-                code=code,
-                device_id=device.uuid,
-                session_type=session_type,
-            )
-            await transaction.commit()
+            await transaction.flush()
             return session
 
     @orm_error_handler
+    @read_replica
     async def get(self, uuid: UUID) -> UserSession:
         async with self.base.transaction_v2():
             return await self.base.get_one(self.model.uuid == uuid)
 
     @orm_error_handler
+    @read_replica
     async def get_all(self, uuid: UUID) -> list[UserSession]:
         async with self.base.transaction_v2() as transaction:
             stmt = (
@@ -102,6 +149,15 @@ class UserSessionRepository:
             cur = await transaction.execute(stmt)
             return cur.scalars().all()
 
+    @orm_error_handler
+    @read_replica
+    async def get_all_rows(self, uuid: UUID) -> list[SessionRow]:
+        """
+        get_all без ORM: один подготовленный запрос asyncpg
+        """
+        async with self.base.transaction_v2():
+            return await self.raw.fetch(SESSION_ROWS_QUERY, uuid, row=SessionRow)
+
     @orm_error_handler
     async def activate(self, uuid: UUID):
         async with self.base.transaction_v2():
@@ -109,3 +165,111 @@ class UserSessionRepository:
                 self.model.uuid == uuid,
                 status_id=1,
             )
+
+    @orm_error_handler
+    async def consume_code(self, uuid: UUID, code: str) -> ConsumeCodeResult:
+        """
+        Атомарное погашение кода сессии с активацией пользователя
+        одним запросом: UPDATE ... RETURNING в CTE
+        """
+        async with self.base.transaction_v2() as transaction:
+            consumed = (
+                update(self.model)
+                .where(
+                    self.model.uuid == uuid,
+                    self.model.code == code,
+                    self.model.status_id == StatusEnum.NOT_ACTIVE,
+                )
+                .values(status_id=StatusEnum.ACTIVE)
+                .returning(self.model.uuid, self.model.user_id)
+                .cte("consumed")
+            )
+            activated = (
+                update(User)
+                .where(
+                    User.uuid == consumed.c.user_id,
+                    User.status_id == StatusEnum.NOT_ACTIVE,
+                )
+                .values(status_id=StatusEnum.ACTIVE)
+                .returning(User.uuid)
+                .cte("activated")
+            )
+            stmt = (
+                select(
+                    self.model.code,
+                    self.model.user_id,
+                    consumed.c.uuid.label("consumed_uuid"),
+                    activated.c.uuid.label("activated_uuid"),
+                )
+                .outerjoin(consumed, consumed.c.uuid == self.model.uuid)
+                .outerjoin(activated, activated.c.uuid == self.model.user_id)
+                .where(self.model.uuid == uuid)
+            )
+            # Запись внутри CTE маршрутизация по выражению не распознает
+            mark_written(transaction)
+            cur = await transaction.execute(stmt)
+            row = cur.first()
+
+        if row is None:
+            return ConsumeCodeResult(status=ConsumeCodeStatus.NOT_FOUND)
+
+        if row.consumed_uuid is not None:
+            return ConsumeCodeResult(
+                status=ConsumeCodeStatus.OK,
+                session_id=row.consumed_uuid,
+                user_id=row.user_id,
+                user_activated=row.activated_uuid is not None,
+            )
+
+        # Снимок внешнего SELECT может не видеть параллельное погашение кода,
+        # поэтому совпавший, но не погашенный код считается уже использованным
+        if row.code != code:
+            return ConsumeCodeResult(status=ConsumeCodeStatus.WRONG_CODE)
+        return ConsumeCodeResult(
+            status=ConsumeCodeStatus.ALREADY_USED,
+            user_id=row.user_id,
+        )
+
+    @orm_error_handler
+    async def create_verified(self, pending: PendingSessionModel) -> ConsumeCodeResult:
+        """
+        Запись уже подтвержденной сессии вместе с активацией пользователя
+        """
+        async with self.base.transaction_v2() as transaction:
+            await self._insert_session(
+                transaction=transaction,
+                uuid=pending.uuid,
+                user_uuid=pending.user_id,
+                code=pending.code,
+                session_type=pending.session_type,
+                status_id=StatusEnum.ACTIVE,
+                device_type=pending.device_type,
+                device_brand=pending.device_brand,
+                device_family=pending.device_family,
+                os_family=pending.os_family,
+                os_version=pending.os_version,
+                browser_family=pending.browser_family,
+                browser_version=pending.browser_version,
+                ip=pending.ip,
+                country=pending.country,
+                city=pending.city,
+            )
+            stmt = (
+                update(User)
+                .where(
+                    User.uuid == pending.user_id,
+                    User.status_id == StatusEnum.NOT_ACTIVE,
+                )
+                .values(status_id=StatusEnum.ACTIVE)
+                .returning(User.uuid)
+            )
+            cur = await transaction.execute(stmt)
+            activated = cur.first()
+            await transaction.flush()
+
+        return ConsumeCodeResult(
+            status=ConsumeCodeStatus.OK,
+            session_id=pending.uuid,
+            user_id=pending.user_id,
+            user_activated=activated is not None,
+        )
@@ -0,0 +1,46 @@
+from typing import Optional
+from uuid import UUID
+
+from asyncpg import Record
+
+
+class DeviceRow:
+    __slots__ = (
+        "uuid",
+        "device_type",
+        "device_brand",
+        "device_family",
+        "os_family",
+        "os_version",
+        "browser_family",
+        "browser_version",
+        "ip",
+        "country",
+        "city",
+    )
+
+    def __init__(self, record: Record):
+        self.uuid: UUID = record["device_uuid"]
+        self.device_type: Optional[str] = record["device_type"]
+        self.device_brand: Optional[str] = record["device_brand"]
+        self.device_family: Optional[str] = record["device_family"]
+        self.os_family: Optional[str] = record["os_family"]
+        self.os_version: Optional[str] = record["os_version"]
+        self.browser_family: Optional[str] = record["browser_family"]
+        self.browser_version: Optional[str] = record["browser_version"]
+        self.ip: Optional[str] = record["ip"]
+        self.country: Optional[str] = record["country"]
+        self.city: Optional[str] = record["city"]
+
+
+class SessionRow:
+    """
+    Сессия с устройством из быстрого пути без ORM, атрибуты как у UserSession
+    """
+
+    __slots__ = ("uuid", "status_id", "device")
+
+    def __init__(self, record: Record):
+        self.uuid: UUID = record["uuid"]
+        self.status_id: Optional[int] = record["status_id"]
+        self.device = DeviceRow(record)
@@ -1,3 +1,4 @@
+from enum import Enum
 from typing import Optional
 from uuid import UUID
 
@@ -8,6 +9,7 @@ from pydantic import Field
 from pydantic import constr
 from pydantic import validator
 
+from app.db.models import SessionTypeEnum
 from app.v1.schemas.base import BaseModelORM
 from app.v1.statuses.schemas import StatusGetMixinV3
 
@@ -66,3 +68,34 @@ class GetSession(BaseModelORM):
 class SystemUserSessionModel(BaseModelORM):
     user_uuid: UUID
     session_uuid: UUID
+
+
+class ConsumeCodeStatus(str, Enum):
+    OK = "OK"
+    WRONG_CODE = "WRONG_CODE"
+    ALREADY_USED = "ALREADY_USED"
+    NOT_FOUND = "NOT_FOUND"
+
+
+class ConsumeCodeResult(BaseModelORM):
+    status: ConsumeCodeStatus
+    session_id: Optional[UUID] = None
+    user_id: Optional[UUID] = None
+    user_activated: bool = False
+
+
+class PendingSessionModel(BaseModelORM):
+    uuid: UUID
+    user_id: UUID
+    code: str
+    session_type: SessionTypeEnum
+    device_type: Optional[str] = None
+    device_brand: Optional[str] = None
+    device_family: Optional[str] = None
+    os_family: Optional[str] = None
+    os_version: Optional[str] = None
+    browser_family: Optional[str] = None
+    browser_version: Optional[str] = None
+    ip: Optional[str] = None
+    country: Optional[str] = None
+    city: Optional[str] = None
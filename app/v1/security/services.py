@@ -1,14 +1,22 @@
 import random
+from typing import Optional
+from typing import Union
 from uuid import UUID
 
-from smsaero.client import SMSAero
-
 from app.db.models import SessionTypeEnum
+from app.db.uow import current_unit_of_work
 from app.db.models import User
 from app.db.models import UserSession
+from app.services.geoip.client import GeoIPClient
 from app.services.ipwhois.client import IPWhoisClient
-from app.utils.u_agents import UserAgentInformation
+from app.services.outbox.client import SMSOutbox
+from app.utils.u_agents import get_fingerprint
+from app.v1.security.cache import principal_cache
+from app.v1.security.pending import RedisPendingSessionRepository
 from app.v1.security.repo import UserSessionRepository
+from app.v1.security.schemas import ConsumeCodeResult
+from app.v1.security.schemas import PendingSessionModel
+from misc import replica_router
 
 
 def generate_code():
@@ -19,19 +27,21 @@ class UserSessionService:
     def __init__(
         self,
         repo: UserSessionRepository,
-        sms_aero: SMSAero,
-        whois: IPWhoisClient,
+        outbox: SMSOutbox,
+        whois: Union[GeoIPClient, IPWhoisClient],
+        pending: Optional[RedisPendingSessionRepository] = None,
     ):
-        self.sms_aero = sms_aero
+        self.outbox = outbox
         self.repo = repo
         self.whois = whois
+        self.pending = pending or repo
 
     async def authorize(
         self,
         user: User,
         user_agent: str,
         ip_address: str,
-    ) -> UserSession:
+    ) -> Union[UserSession, PendingSessionModel]:
         return await self.create(
             user=user,
             user_agent=user_agent,
@@ -44,7 +54,7 @@ class UserSessionService:
         user: User,
         user_agent: str,
         ip_address: str,
-    ) -> UserSession:
+    ) -> Union[UserSession, PendingSessionModel]:
         return await self.create(
             user=user,
             user_agent=user_agent,
@@ -58,40 +68,49 @@ class UserSessionService:
         user_agent: str,
         ip_address: str,
         session_type: SessionTypeEnum,
-    ) -> UserSession:
-        fingerprint = UserAgentInformation(v=user_agent)
-        # ip_info = await self.whois.get(ip=ip_address)
-        # print(ip_info)
+    ) -> Union[UserSession, PendingSessionModel]:
+        fingerprint = get_fingerprint(v=user_agent)
+        ip_info = await self.whois.get(ip=ip_address)
         random_code = generate_code()
 
-        await self.send_code(phone=user.phone, code=random_code)
-        return await self.repo.create(
+        session = await self.pending.create(
             user_uuid=user.uuid,
             code=random_code,
             device_type=fingerprint.type,
-            device_brand=fingerprint.device.brand,
-            device_family=fingerprint.device.family,
-            os_family=fingerprint.os.family,
-            os_version=fingerprint.os.version_string,
-            browser_family=fingerprint.browser.family,
-            browser_version=fingerprint.browser.version_string,
+            device_brand=fingerprint.device_brand,
+            device_family=fingerprint.device_family,
+            os_family=fingerprint.os_family,
+            os_version=fingerprint.os_version,
+            browser_family=fingerprint.browser_family,
+            browser_version=fingerprint.browser_version,
             ip=ip_address,
-            # country=ip_info.country,
-            # city=ip_info.city,
-            country="Russia",
-            city="Moscow",
+            country=ip_info.country,
+            city=ip_info.city,
             session_type=session_type,
         )
+        await self.send_code(phone=user.phone, code=random_code)
+        return session
 
     async def send_code(self, phone: str, code: str) -> None:
-        await self.sms_aero.sms.send(
-            phone=phone,
-            sign="SMS Aero",
-            text=f"Ваш код для авторизации в CapiGram: {code}",
-        )
+        text = f"Ваш код для авторизации в CapiGram: {code}"
+
+        # Код отправляется только если сессия запроса зафиксирована
+        unit_of_work = current_unit_of_work()
+        if unit_of_work is not None:
+            unit_of_work.after_commit(lambda: self.outbox.send(phone=phone, text=text))
+        else:
+            await self.outbox.send(phone=phone, text=text)
 
     async def get(self, uuid: UUID) -> UserSession:
         return await self.repo.get(uuid=uuid)
 
     async def activate_code(self, uuid: UUID):
         return await self.repo.activate(uuid=uuid)
+
+    async def verify(self, uuid: UUID, code: str) -> ConsumeCodeResult:
+        result = await self.pending.consume_code(uuid=uuid, code=code)
+        if result.user_id is not None:
+            await replica_router.track_user(user_uuid=result.user_id)
+        if result.user_activated:
+            await principal_cache.invalidate_user(user_uuid=result.user_id)
+        return result
@@ -1,11 +1,66 @@
+import hashlib
+from enum import Enum
+from typing import Iterable
+from typing import Optional
 from typing import Type
 
-from app.v1.users.schemas import RoleEnum
+from app.v1.users.enums import RoleEnum
 
+DEVICE_FINGERPRINT_FIELDS = (
+    "device_type",
+    "device_brand",
+    "device_family",
+    "os_family",
+    "os_version",
+    "browser_family",
+    "browser_version",
+    "ip",
+    "country",
+    "city",
+)
 
-class Permission:
-    PROFILE_GET = {
+
+class Permission(str, Enum):
+    PROFILE_GET = "profile_get"
+
+
+# Роль -> роли, над профилями которых разрешено действие
+PERMISSIONS = {
+    Permission.PROFILE_GET: {
         RoleEnum.USER: [RoleEnum.USER],
         RoleEnum.MODERATOR: [RoleEnum.USER, RoleEnum.MODERATOR],
         RoleEnum.ADMIN: [RoleEnum.USER, RoleEnum.MODERATOR, RoleEnum.ADMIN]
-    }
+    },
+}
+
+
+def role_mask(roles: Iterable[int]) -> int:
+    mask = 0
+    for role in roles:
+        mask |= 1 << role
+    return mask
+
+
+def has_role(mask: int, role_id: Optional[int]) -> bool:
+    return role_id is not None and bool(mask >> role_id & 1)
+
+
+def make_device_fingerprint(**device: Optional[str]) -> str:
+    """
+    Детерминированный ключ устройства: sha256 от полей User-Agent и IP/гео.
+    Совпадает с выражением DEVICE_FINGERPRINT_SQL для обратного заполнения
+    """
+    values = []
+    for field in DEVICE_FINGERPRINT_FIELDS:
+        value = device.get(field)
+        if isinstance(value, Enum):
+            value = value.value
+        values.append("" if value is None else str(value))
+    return hashlib.sha256("\x1f".join(values).encode()).hexdigest()
+
+
+DEVICE_FINGERPRINT_SQL = (
+    "encode(sha256(convert_to(concat_ws(chr(31), "
+    + ", ".join(f"coalesce({field}, '')" for field in DEVICE_FINGERPRINT_FIELDS)
+    + "), 'UTF8')), 'hex')"
+)
@@ -1,5 +1,6 @@
 from typing import Optional
 
+from app.v1.reference.schemas import ReferenceModelORM
 from app.v1.schemas.base import BaseModelORM
 
 
@@ -8,5 +9,5 @@ class Statuses(BaseModelORM):
     title: str
 
 
-class StatusGetMixinV3(BaseModelORM):
+class StatusGetMixinV3(ReferenceModelORM):
     status: Optional[Statuses] = None
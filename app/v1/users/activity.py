@@ -0,0 +1,156 @@
+import asyncio
+import datetime
+import logging
+import time
+from contextlib import suppress
+from typing import Optional
+from uuid import UUID
+
+from prometheus_client import Counter
+from prometheus_client import Gauge
+from prometheus_client import Histogram
+from sqlalchemy import Boolean
+from sqlalchemy import DateTime
+from sqlalchemy import cast
+from sqlalchemy import func
+from sqlalchemy import literal
+from sqlalchemy import select
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.types import TypeEngine
+
+from app.db.metrics import query_label
+from app.db.models import User
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_BUFFER_SIZE = Gauge(
+    "activity_buffer_size",
+    "Пользователи с несохраненной активностью",
+)
+ACTIVITY_FLUSH_LATENCY = Histogram(
+    "activity_buffer_flush_latency_seconds",
+    "Время сохранения пачки активности",
+)
+ACTIVITY_FLUSHED = Counter(
+    "activity_buffer_flushed_total",
+    "Сохраненные обновления активности",
+    ["result"],
+)
+
+
+class ActivityBuffer:
+    """
+    Write-behind буфер heartbeat-запросов: в памяти хранится только последнее
+    состояние каждого пользователя, раз в flush_interval все накопленное
+    сохраняется одним UPDATE ... FROM (SELECT unnest(...)): три параметра-массива
+    вместо трех параметров на строку
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        flush_interval: float,
+        max_size: int,
+    ):
+        self.engine = engine
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+
+        self._pending: dict[UUID, tuple[bool, Optional[datetime.datetime]]] = {}
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def record(
+        self,
+        uuid: UUID,
+        is_online: bool,
+        last_activity: Optional[datetime.datetime] = None,
+    ) -> None:
+        self._pending[uuid] = (is_online, last_activity)
+        ACTIVITY_BUFFER_SIZE.set(len(self._pending))
+        if len(self._pending) >= self.max_size:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            # Пачка, прерванная отменой, возвращается в буфер до финального flush
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), timeout=self.flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            ACTIVITY_BUFFER_SIZE.set(0)
+
+            started_at = time.perf_counter()
+            try:
+                with query_label("ActivityBuffer.flush"):
+                    async with self.engine.begin() as connection:
+                        await connection.execute(self._statement(pending))
+            except BaseException as exc:
+                # Более свежие heartbeat, пришедшие во время записи, не затираются.
+                # При отмене пачка тоже возвращается, иначе она терялась бы
+                for uuid, state in pending.items():
+                    self._pending.setdefault(uuid, state)
+                ACTIVITY_BUFFER_SIZE.set(len(self._pending))
+                if not isinstance(exc, Exception):
+                    raise
+                logger.error(msg="activity flush failed", exc_info=exc)
+                ACTIVITY_FLUSHED.labels("error").inc(len(pending))
+                return
+            finally:
+                ACTIVITY_FLUSH_LATENCY.observe(time.perf_counter() - started_at)
+
+            ACTIVITY_FLUSHED.labels("ok").inc(len(pending))
+
+    @staticmethod
+    def _statement(pending: dict[UUID, tuple[bool, Optional[datetime.datetime]]]):
+        uuids = list(pending)
+        is_online = [state[0] for state in pending.values()]
+        last_activity = [state[1] for state in pending.values()]
+
+        activity = select(
+            _unnest(uuids, PG_UUID(as_uuid=True)).label("uuid"),
+            _unnest(is_online, Boolean).label("is_online"),
+            _unnest(last_activity, DateTime).label("last_activity"),
+        ).subquery("activity")
+
+        return (
+            update(User)
+            .where(User.uuid == activity.c.uuid)
+            .values(
+                is_online=activity.c.is_online,
+                last_activity=func.coalesce(
+                    activity.c.last_activity, User.last_activity
+                ),
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+
+def _unnest(items: list, type_: TypeEngine):
+    # Явный тип массива: asyncpg не выводит тип параметра unnest
+    return func.unnest(cast(literal(items, ARRAY(type_)), ARRAY(type_)))
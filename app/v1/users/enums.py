@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class RoleEnum(int, Enum):
+    ADMIN = 1
+    MODERATOR = 2
+    USER = 3
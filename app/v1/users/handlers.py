@@ -1,21 +1,37 @@
+from typing import Optional
 from uuid import UUID
 
 from fastapi import APIRouter
 from fastapi import Depends
+from fastapi import Query
+from fastapi.responses import StreamingResponse
 
+from app.dto.types.datetime_without_tz import DateTimeWithoutTZ
 from app.exceptions.routes.models import ForbiddenError
 from app.utils.decorators import standardize_response
+from app.utils.export import csv_chunks
+from app.utils.export import ndjson_chunks
 from app.v1.schemas.responses import BaseResponse
+from app.v1.reference.registry import reference_registry
+from app.v1.schemas.responses import PageResponse
 from app.v1.security.auth import GetCurrentUser
 from app.v1.security.utils import Permission
 from app.v1.users.dependencies import UsersDependencyMarker
+from app.v1.users.enums import RoleEnum
 from app.v1.users.schemas import CreateUserModel
+from app.v1.users.schemas import ExportFormat
 from app.v1.users.schemas import GetCurrentUserModel
 from app.v1.users.schemas import GetUserWithPhoneEmail
+from app.v1.users.schemas import PresenceDTO
+from app.v1.users.schemas import PresenceQueryDTO
 from app.v1.users.schemas import RegisterUserDTO
 from app.v1.users.schemas import UpdateActivityDTO
 from app.v1.users.schemas import UpdateMeDTO
+from app.v1.users.schemas import UserBatchItemDTO
+from app.v1.users.schemas import UserExportColumn
+from app.v1.users.schemas import UsersBatchQueryDTO
 from app.v1.users.services import UserService
+from config import settings_app
 
 user_router = APIRouter()
 
@@ -42,6 +58,35 @@ async def create_user(
     return user
 
 
+@user_router.get(
+    "/users/export",
+    summary="Выгрузка пользователей (NDJSON или CSV)",
+    response_class=StreamingResponse,
+    status_code=200,
+)
+async def export_users(
+    format: ExportFormat = ExportFormat.NDJSON,
+    columns: Optional[list[UserExportColumn]] = Query(default=None),
+    updated_since: Optional[DateTimeWithoutTZ] = None,
+    current_user: GetCurrentUserModel = Depends(GetCurrentUser()),
+    user_service: UserService = Depends(UsersDependencyMarker),
+):
+    if current_user.role is None or current_user.role.id != RoleEnum.ADMIN:
+        raise ForbiddenError("Выгрузка пользователей доступна только администраторам")
+
+    columns = [column.value for column in columns or UserExportColumn]
+    batches = user_service.stream_export(
+        columns=columns,
+        batch_size=settings_app.USERS_EXPORT_BATCH_SIZE,
+        updated_since=updated_since,
+    )
+    if format == ExportFormat.CSV:
+        return StreamingResponse(
+            csv_chunks(batches, columns=columns), media_type="text/csv"
+        )
+    return StreamingResponse(ndjson_chunks(batches), media_type="application/x-ndjson")
+
+
 @user_router.get(
     "/users/{uuid}",
     summary="Получение пользователя",
@@ -54,9 +99,11 @@ async def get_user(
     current_user: GetCurrentUserModel = Depends(GetCurrentUser()),
     user_service: UserService = Depends(UsersDependencyMarker),
 ):
-    user = await user_service.get_one_from_uuid(uuid=uuid, author_uuid=current_user.uuid)
+    user = await user_service.get_profile_row(uuid=uuid, author_uuid=current_user.uuid)
 
-    if user.role.id not in Permission.PROFILE_GET.get(current_user.role.id):
+    if not reference_registry.allows(
+        Permission.PROFILE_GET, current_user.role.id, user.role_id
+    ):
         raise ForbiddenError("У вас нет прав на просмотр данного профиля")
 
     return user
@@ -65,22 +112,70 @@ async def get_user(
 @user_router.get(
     "/users",
     summary="Получение пользователей",
-    response_model=BaseResponse[list[GetUserWithPhoneEmail]],
+    response_model=PageResponse[list[GetUserWithPhoneEmail]],
     status_code=200,
 )
 @standardize_response(status_code=200)
 async def get_user(
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[UUID] = Query(
+        default=None, description="next_cursor предыдущей страницы"
+    ),
+    status_id: Optional[int] = None,
+    role_id: Optional[int] = None,
     current_user: GetCurrentUserModel = Depends(GetCurrentUser()),
     user_service: UserService = Depends(UsersDependencyMarker),
 ):
-    user = await user_service.get_all(author_uuid=current_user.uuid)
-    return user
+    return await user_service.get_all(
+        author_uuid=current_user.uuid,
+        limit=limit,
+        cursor=cursor,
+        status_id=status_id,
+        role_id=role_id,
+    )
+
+
+@user_router.post(
+    "/users/batch",
+    summary="Получение пользователей по списку идентификаторов",
+    response_model=BaseResponse[list[UserBatchItemDTO]],
+    status_code=200,
+)
+@standardize_response(status_code=200)
+async def get_users_batch(
+    data: UsersBatchQueryDTO,
+    current_user: GetCurrentUserModel = Depends(GetCurrentUser()),
+    user_service: UserService = Depends(UsersDependencyMarker),
+):
+    return await user_service.get_batch(
+        uuids=data.uuids,
+        author_uuid=current_user.uuid,
+        author_role_id=current_user.role.id if current_user.role else None,
+    )
+
+
+@user_router.post(
+    "/users/presence",
+    summary="Присутствие пользователей",
+    response_model=BaseResponse[list[PresenceDTO]],
+    status_code=200,
+)
+@standardize_response(status_code=200)
+async def get_presence(
+    data: PresenceQueryDTO,
+    current_user: GetCurrentUserModel = Depends(GetCurrentUser()),
+    user_service: UserService = Depends(UsersDependencyMarker),
+):
+    return await user_service.get_presence(
+        uuids=data.uuids,
+        author_role_id=current_user.role.id if current_user.role else None,
+    )
 
 
 @user_router.patch(
     "/auth/me/activity",
     summary="Обновить последнюю активность",
-    # response_model=BaseResponse[list[GetUserWithPhoneEmail]],
+    response_model=BaseResponse[GetUserWithPhoneEmail],
     status_code=200,
     include_in_schema=True,
 )
@@ -91,6 +186,9 @@ async def update_last_activity(
     user_service: UserService = Depends(UsersDependencyMarker),
 ):
     user = await user_service.update_activity(uuid=current_user.uuid, data=data)
+    if user is None:
+        # Запись отложена буфером: ответ той же формы, что и после UPDATE
+        user = current_user.copy(update=data.dict(exclude_none=True))
     return user
 
 
@@ -0,0 +1,79 @@
+import datetime
+import logging
+import time
+from typing import Optional
+from uuid import UUID
+
+from prometheus_client import Counter
+from redis.asyncio import Redis
+
+from app.v1.users.schemas import PresenceDTO
+
+logger = logging.getLogger(__name__)
+
+PRESENCE_LOOKUPS = Counter(
+    "presence_lookups_total",
+    "Запросы присутствия по источнику ответа",
+    ["source"],
+)
+
+
+class PresenceIndex:
+    """
+    Присутствие пользователей в redis: ключ на пользователя со значением
+    "online|время heartbeat на сервере|last_activity". Пользователь онлайн,
+    если последний heartbeat был online и не старше online_ttl секунд.
+    Ключи живут retention секунд, в Postgres состояние сохраняется
+    отложенно через ActivityBuffer
+    """
+
+    KEY = "v2:presence:{uuid}"
+
+    def __init__(self, redis: Redis, online_ttl: int, retention: int):
+        self.redis = redis
+        self.online_ttl = online_ttl
+        self.retention = retention
+
+    async def touch(
+        self,
+        uuid: UUID,
+        is_online: bool,
+        last_activity: Optional[datetime.datetime] = None,
+    ) -> None:
+        last_activity = last_activity or datetime.datetime.utcnow()
+        value = f"{int(is_online)}|{time.time()}|{last_activity.isoformat()}"
+        try:
+            await self.redis.set(
+                self.KEY.format(uuid=uuid), value, ex=self.retention
+            )
+        except Exception as exc:
+            logger.warning(msg="presence index is unavailable", exc_info=exc)
+
+    async def get_many(self, uuids: list[UUID]) -> dict[UUID, PresenceDTO]:
+        """
+        Присутствие по списку пользователей одной командой MGET.
+        Пользователи без ключа в redis в результат не попадают
+        """
+        if not uuids:
+            return {}
+        try:
+            values = await self.redis.mget(
+                [self.KEY.format(uuid=uuid) for uuid in uuids]
+            )
+        except Exception as exc:
+            logger.warning(msg="presence index is unavailable", exc_info=exc)
+            return {}
+
+        now = time.time()
+        result = {}
+        for uuid, value in zip(uuids, values):
+            if value is None:
+                continue
+            online, seen_at, last_activity = value.decode().split("|", 2)
+            result[uuid] = PresenceDTO(
+                uuid=uuid,
+                is_online=online == "1" and now - float(seen_at) < self.online_ttl,
+                last_activity=datetime.datetime.fromisoformat(last_activity),
+            )
+        PRESENCE_LOOKUPS.labels("redis").inc(len(result))
+        return result
@@ -1,25 +1,59 @@
-from typing import List
+import datetime
+from typing import AsyncIterator
+from typing import Optional
+from typing import Sequence
+from typing import Union
 from uuid import UUID
 
+from sqlalchemy import any_
 from sqlalchemy import case
+from sqlalchemy import cast
+from sqlalchemy import func
+from sqlalchemy import literal
 from sqlalchemy import select
 from sqlalchemy import update
-from sqlalchemy.orm import joinedload
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.engine import Row
+from sqlalchemy.engine import RowMapping
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm import with_expression
 
 from app.db.crud.base import BaseCRUD
+from app.db.crud.raw import RawCRUD
 from app.db.decorators import orm_error_handler
+from app.db.decorators import read_replica
+from app.db.metrics import query_label
 from app.db.models import Document
 from app.db.models import User
+from app.db.projection import FieldSpec
+from app.db.projection import projection
+from app.db.routing import route_to
+from app.utils.pagination import Page
+from app.v1.users.rows import UserRow
+from app.v1.users.schemas import GetUserWithPhoneEmail
+
+UUID_ARRAY = ARRAY(PG_UUID(as_uuid=True))
+
+# Колонки GetCurrentUserModel и GetUserWithPhoneEmail, роль и статус по id
+USER_ROW_QUERY = """
+    SELECT u.uuid, u.login, u.first_name, u.last_name, u.phone, u.email,
+           u.is_online, u.last_activity, u.role_id, u.status_id,
+           u.uuid = $2 AS is_me, d.document_id AS avatar_document_id
+    FROM users u
+    LEFT JOIN documents d ON d.uuid = u.avatar_id
+    WHERE u.uuid = $1
+"""
 
 
 class UserRepository:
-    def __init__(self, db_session: sessionmaker):
+    def __init__(self, db_session: Union[sessionmaker, AsyncSession]):
         self.db_session = db_session
         self.model = User
 
         self.base = BaseCRUD(db_session=db_session, model=self.model)
+        self.raw = RawCRUD(session=self.base.session)
 
     @orm_error_handler
     async def _create(
@@ -45,7 +79,7 @@ class UserRepository:
                 role_id=role_id,
             )
             transaction.add(model)
-            await transaction.commit()
+            await transaction.flush()
             return model
 
     @orm_error_handler
@@ -68,11 +102,17 @@ class UserRepository:
                 document_id=document_id,
             )
             transaction.add(model)
-            await transaction.commit()
+            await transaction.flush()
             return model
 
     @orm_error_handler
-    async def get_one_from_uuid(self, uuid: UUID, author_uuid: UUID) -> User:
+    @read_replica
+    async def get_one_from_uuid(
+        self,
+        uuid: UUID,
+        author_uuid: UUID,
+        fields: Sequence[FieldSpec] = (GetUserWithPhoneEmail,),
+    ) -> User:
         async with self.base.transaction_v2():
             stmt = (
                 select(User)
@@ -81,8 +121,7 @@ class UserRepository:
                         self.model.is_me,
                         self.__is_me_expression(user_id=author_uuid)
                     ),
-                    joinedload(User.avatar),
-                    joinedload(User.role),
+                    *projection(self.model, *fields),
                 )
                 .filter(User.uuid == uuid)
             )
@@ -90,12 +129,13 @@ class UserRepository:
             return curr.scalar_one()
 
     @orm_error_handler
-    async def get_one_from_phone(self, phone: str) -> User:
-        async with self.base.transaction_v2():
-            return await self.base.get_one(self.model.phone == phone)
-
-    @orm_error_handler
-    async def get_all(self, author_uuid: UUID) -> List[User]:
+    @read_replica
+    async def get_many_from_uuids(
+        self,
+        uuids: Sequence[UUID],
+        author_uuid: UUID,
+        fields: Sequence[FieldSpec] = (GetUserWithPhoneEmail,),
+    ) -> list[User]:
         async with self.base.transaction_v2():
             stmt = (
                 select(User)
@@ -104,22 +144,129 @@ class UserRepository:
                         self.model.is_me,
                         self.__is_me_expression(user_id=author_uuid)
                     ),
-                    joinedload(self.model.role),
-                    joinedload(self.model.avatar),
+                    *projection(self.model, *fields),
                 )
-                .filter(User.uuid != author_uuid)
+                .filter(User.uuid == _any_uuid(uuids))
             )
             curr = await self.base.session.execute(stmt)
             return curr.scalars().all()
 
+    @orm_error_handler
+    @read_replica
+    async def get_profile_row(self, uuid: UUID, author_uuid: UUID) -> UserRow:
+        """
+        get_one_from_uuid без ORM: один подготовленный запрос asyncpg
+        """
+        async with self.base.transaction_v2():
+            return await self.raw.fetch_one(
+                USER_ROW_QUERY, uuid, author_uuid, row=UserRow
+            )
+
+    async def get_principal_row(self, uuid: UUID) -> UserRow:
+        return await self.get_profile_row(uuid=uuid, author_uuid=uuid)
+
+    @orm_error_handler
+    async def get_one_from_phone(
+        self,
+        phone: str,
+        fields: Sequence[FieldSpec] = ("uuid", "phone", "password", "status_id"),
+    ) -> User:
+        # Вход сразу после регистрации не должен зависеть от отставания реплик
+        with route_to(read_only=False):
+            async with self.base.transaction_v2():
+                stmt = (
+                    select(User)
+                    .options(*projection(self.model, *fields))
+                    .filter(User.phone == phone)
+                )
+                curr = await self.base.session.execute(stmt)
+                return curr.scalar_one()
+
+    @orm_error_handler
+    async def get_all(
+        self,
+        author_uuid: UUID,
+        limit: int,
+        cursor: Optional[UUID] = None,
+        status_id: Optional[int] = None,
+        role_id: Optional[int] = None,
+        fields: Sequence[FieldSpec] = (GetUserWithPhoneEmail,),
+    ) -> Page:
+        filters = [self.model.uuid != author_uuid]
+        if status_id is not None:
+            filters.append(self.model.status_id == status_id)
+        if role_id is not None:
+            filters.append(self.model.role_id == role_id)
+
+        async with self.base.transaction_v2():
+            return await self.base.get_page(
+                *filters,
+                limit=limit,
+                cursor=cursor,
+                options=(
+                    with_expression(
+                        self.model.is_me,
+                        self.__is_me_expression(user_id=author_uuid)
+                    ),
+                    *projection(self.model, *fields),
+                ),
+            )
+
+    @orm_error_handler
+    @read_replica
+    async def get_activity(self, uuids: Sequence[UUID]) -> list[Row]:
+        async with self.base.transaction_v2():
+            stmt = select(
+                self.model.uuid,
+                self.model.role_id,
+                self.model.is_online,
+                self.model.last_activity,
+            ).where(self.model.uuid == _any_uuid(uuids))
+            curr = await self.base.session.execute(stmt)
+            return curr.all()
+
+    async def stream_export(
+        self,
+        columns: Sequence[str],
+        batch_size: int,
+        updated_since: Optional[datetime.datetime] = None,
+    ) -> AsyncIterator[Sequence[RowMapping]]:
+        """
+        Выгрузка через серверный курсор: в памяти не больше одной пачки строк
+        """
+        stmt = (
+            select(*(getattr(self.model, column) for column in columns))
+            .order_by(self.model.uuid)
+            .execution_options(yield_per=batch_size)
+        )
+        if updated_since is not None:
+            stmt = stmt.where(
+                func.coalesce(self.model.updated_at, self.model.created_at)
+                >= updated_since
+            )
+
+        # Маршрут и метка - ContextVar: их нельзя держать открытыми через
+        # yield, иначе reset при отключении клиента выполняется в другом
+        # контексте. Реплика выбирается при открытии курсора, дальнейшие
+        # пачки читаются из уже выбранного соединения
+        with route_to(read_only=True), query_label("UserRepository.stream_export"):
+            result = await self.base.session.stream(stmt)
+        async for batch in result.mappings().partitions():
+            yield batch
+
     @orm_error_handler
     async def activate(self, uuid: UUID) -> User:
         async with self.base.transaction_v2() as transaction:
             result = await self.base.update(self.model.uuid == uuid, status_id=1)
-            await transaction.commit()
+            await transaction.flush()
             return result
 
     def __is_me_expression(self, user_id: UUID):
         return case(
             [(self.model.uuid == user_id, True)], else_=False
         ).label("is_me")
+
+
+def _any_uuid(uuids: Sequence[UUID]):
+    # Один параметр-массив вместо параметра на каждый элемент IN (...)
+    return any_(cast(literal(list(uuids), UUID_ARRAY), UUID_ARRAY))
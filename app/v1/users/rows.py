@@ -0,0 +1,50 @@
+import datetime
+from typing import Optional
+from uuid import UUID
+
+from asyncpg import Record
+
+
+class AvatarRow:
+    __slots__ = ("document_id",)
+
+    def __init__(self, document_id: UUID):
+        self.document_id = document_id
+
+
+class UserRow:
+    """
+    Профиль пользователя из быстрого пути без ORM. Атрибуты совпадают
+    с User, поэтому модели ответа собираются через from_orm как обычно
+    """
+
+    __slots__ = (
+        "uuid",
+        "login",
+        "first_name",
+        "last_name",
+        "phone",
+        "email",
+        "is_online",
+        "last_activity",
+        "role_id",
+        "status_id",
+        "is_me",
+        "avatar",
+    )
+
+    def __init__(self, record: Record):
+        self.uuid: UUID = record["uuid"]
+        self.login: str = record["login"]
+        self.first_name: str = record["first_name"]
+        self.last_name: str = record["last_name"]
+        self.phone: str = record["phone"]
+        self.email: Optional[str] = record["email"]
+        self.is_online: Optional[bool] = record["is_online"]
+        self.last_activity: Optional[datetime.datetime] = record["last_activity"]
+        self.role_id: Optional[int] = record["role_id"]
+        self.status_id: Optional[int] = record["status_id"]
+        self.is_me: bool = record["is_me"]
+
+        document_id = record["avatar_document_id"]
+        self.avatar = AvatarRow(document_id) if document_id is not None else None
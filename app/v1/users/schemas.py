@@ -9,15 +9,33 @@ from pydantic import Field
 from pydantic import validator
 
 from app.dto.types.datetime_without_tz import DateTimeWithoutTZ
+from app.v1.reference.schemas import ReferenceModelORM
 from app.v1.schemas.base import BaseModelORM
 from app.v1.schemas.phone import Phone
+from app.v1.statuses.enums import StatusEnum
 from app.v1.statuses.schemas import StatusGetMixinV3
+from app.v1.users.enums import RoleEnum
 
 
-class RoleEnum(int, Enum):
-    ADMIN = 1
-    MODERATOR = 2
-    USER = 3
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class UserExportColumn(str, Enum):
+    UUID = "uuid"
+    LOGIN = "login"
+    PHONE = "phone"
+    EMAIL = "email"
+    FIRST_NAME = "first_name"
+    LAST_NAME = "last_name"
+    STATUS_ID = "status_id"
+    ROLE_ID = "role_id"
+    AVATAR_ID = "avatar_id"
+    IS_ONLINE = "is_online"
+    LAST_ACTIVITY = "last_activity"
+    CREATED_AT = "created_at"
+    UPDATED_AT = "updated_at"
 
 
 class RoleDTO(BaseModelORM):
@@ -35,7 +53,7 @@ class AvatarDTO(BaseModelORM):
         return f"https://document.capi.shitposting.team/v1/documents/{avatar_id}/file"
 
 
-class GetUserModel(BaseModelORM):
+class GetUserModel(ReferenceModelORM):
     uuid: UUID
     login: str
     first_name: str
@@ -76,11 +94,49 @@ class CreateUserModel(BaseModelORM):
     last_name: str
 
 
+class ImportUserModel(BaseModelORM):
+    phone: Phone
+    login: str
+    first_name: str
+    last_name: str
+    email: Optional[EmailStr] = None
+    password: Optional[str] = None
+    password_hash: Optional[str] = None
+    role_id: int = RoleEnum.USER.value
+    status_id: int = StatusEnum.ACTIVE.value
+
+
 class UpdateActivityDTO(BaseModelORM):
     is_online: bool
     last_activity: Optional[DateTimeWithoutTZ]
 
 
+class BatchLookupStatus(str, Enum):
+    FOUND = "found"
+    NOT_FOUND = "not_found"
+    FORBIDDEN = "forbidden"
+
+
+class UsersBatchQueryDTO(BaseModelORM):
+    uuids: list[UUID] = Field(min_items=1, max_items=500)
+
+
+class UserBatchItemDTO(BaseModelORM):
+    uuid: UUID
+    status: BatchLookupStatus
+    user: Optional[GetUserWithPhoneEmail] = None
+
+
+class PresenceQueryDTO(BaseModelORM):
+    uuids: list[UUID] = Field(max_items=5000)
+
+
+class PresenceDTO(BaseModelORM):
+    uuid: UUID
+    is_online: bool
+    last_activity: Optional[datetime.datetime] = None
+
+
 class UpdateMeDTO(BaseModelORM):
     first_name: Optional[str] = None
     last_name: Optional[str] = None
@@ -93,3 +149,11 @@ class RegisterUserDTO(BaseModelORM):
     login: str
     first_name: str
     last_name: str
+
+
+class CurrentUserPrincipal(BaseModelORM):
+    status_id: Optional[int] = None
+    # Роль проверяется и разрешается по реестру при каждом запросе,
+    # а не берется из закэшированного user.role
+    role_id: Optional[int] = None
+    user: GetCurrentUserModel
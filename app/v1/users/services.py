@@ -1,19 +1,39 @@
 from typing import Any
+from typing import Optional
+from typing import Union
 from uuid import UUID
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker
 
 from app.db.models import User
-from app.v1.security.context import get_password_hash
+from app.v1.reference.registry import reference_registry
+from app.v1.security.cache import principal_cache
+from app.v1.security.context import hash_password_async
+from app.v1.security.utils import Permission
+from app.v1.users.activity import ActivityBuffer
+from app.v1.users.presence import PRESENCE_LOOKUPS
+from app.v1.users.presence import PresenceIndex
 from app.v1.users.repo import UserRepository
+from app.v1.users.schemas import BatchLookupStatus
+from app.v1.users.schemas import PresenceDTO
 from app.v1.users.schemas import UpdateActivityDTO
 from app.v1.users.schemas import UpdateMeDTO
-from misc import cache
+from app.v1.users.schemas import UserBatchItemDTO
+
+DEFAULT_AVATAR_ID = UUID("c4af61d6-64a0-4c34-891d-340977bbc2b3")
 
 
 class UserService(UserRepository):
-    def __init__(self, db_session: sessionmaker):
+    def __init__(
+        self,
+        db_session: Union[sessionmaker, AsyncSession],
+        activity: Optional[ActivityBuffer] = None,
+        presence: Optional[PresenceIndex] = None,
+    ):
         super().__init__(db_session=db_session)
+        self.activity = activity
+        self.presence = presence
 
     async def create(
         self,
@@ -24,7 +44,7 @@ class UserService(UserRepository):
         password: str,
         status_id: int,
     ) -> User:
-        hashed_password = get_password_hash(password)
+        hashed_password = await hash_password_async(password)
         return await super()._create(
             login=login,
             phone=phone,
@@ -32,7 +52,7 @@ class UserService(UserRepository):
             last_name=last_name,
             password=hashed_password,
             status_id=status_id,
-            avatar_id=UUID("c4af61d6-64a0-4c34-891d-340977bbc2b3"),
+            avatar_id=DEFAULT_AVATAR_ID,
             role_id=3,
         )
 
@@ -40,7 +60,25 @@ class UserService(UserRepository):
         self,
         uuid: UUID,
         data: UpdateActivityDTO,
-    ):
+    ) -> Optional[User]:
+        """
+        Обновленный пользователь или None, если запись отложена буфером
+        """
+        if self.presence is not None:
+            await self.presence.touch(
+                uuid=uuid,
+                is_online=data.is_online,
+                last_activity=data.last_activity,
+            )
+
+        if self.activity is not None:
+            self.activity.record(
+                uuid=uuid,
+                is_online=data.is_online,
+                last_activity=data.last_activity,
+            )
+            return None
+
         data_without_none = data.dict(exclude_none=True)
 
         return await super()._update(
@@ -48,14 +86,86 @@ class UserService(UserRepository):
             **data_without_none,
         )
 
-    @cache.invalidate("v2:users:get_current:user_uuid:{uuid}:*")
+    async def get_batch(
+        self,
+        uuids: list[UUID],
+        author_uuid: UUID,
+        author_role_id: Optional[int],
+    ) -> list[UserBatchItemDTO]:
+        """
+        Профили одним запросом в порядке uuids, с проверкой
+        Permission.PROFILE_GET для каждой записи
+        """
+        users = await self.get_many_from_uuids(
+            uuids=list(set(uuids)), author_uuid=author_uuid
+        )
+        by_uuid = {user.uuid: user for user in users}
+
+        items = []
+        for uuid in uuids:
+            user = by_uuid.get(uuid)
+            if user is None:
+                status = BatchLookupStatus.NOT_FOUND
+            elif not reference_registry.allows(
+                Permission.PROFILE_GET, author_role_id, user.role_id
+            ):
+                status, user = BatchLookupStatus.FORBIDDEN, None
+            else:
+                status = BatchLookupStatus.FOUND
+            items.append(UserBatchItemDTO(uuid=uuid, status=status, user=user))
+        return items
+
+    async def get_presence(
+        self,
+        uuids: list[UUID],
+        author_role_id: Optional[int],
+    ) -> list[PresenceDTO]:
+        """
+        Присутствие в порядке uuids. Как и для профилей, проверяется
+        Permission.PROFILE_GET: пользователи, чей профиль автору
+        недоступен, в ответ не попадают
+        """
+        uuids = list(dict.fromkeys(uuids))
+        found = {}
+        if self.presence is not None:
+            found = await self.presence.get_many(uuids=uuids)
+
+        missing = [uuid for uuid in uuids if uuid not in found]
+        if reference_registry.allows_all(Permission.PROFILE_GET, author_role_id):
+            rows = await self.get_activity(uuids=missing) if missing else []
+        else:
+            # Роли нужны для всех запрошенных, не только для отсутствующих в redis
+            rows = [
+                row
+                for row in await self.get_activity(uuids=uuids)
+                if reference_registry.allows(
+                    Permission.PROFILE_GET, author_role_id, row.role_id
+                )
+            ]
+            allowed = {row.uuid for row in rows}
+            found = {uuid: item for uuid, item in found.items() if uuid in allowed}
+
+        # Нет heartbeat за период хранения: последнее сохраненное состояние,
+        # is_online в таблице может устареть, поэтому считаем пользователя офлайн
+        for row in rows:
+            if row.uuid not in found:
+                found[row.uuid] = PresenceDTO(
+                    uuid=row.uuid,
+                    is_online=False,
+                    last_activity=row.last_activity,
+                )
+        if missing:
+            PRESENCE_LOOKUPS.labels("postgres").inc(len(missing))
+
+        return [found[uuid] for uuid in uuids if uuid in found]
+
     async def update_me(
         self,
         uuid: UUID,
         data: UpdateMeDTO,
     ):
         if data.password:
-            data.password = get_password_hash(data.password)
+            data.password = await hash_password_async(data.password)
 
         if data.avatar_id:
             document = await self.create_document(document_id=data.avatar_id)
@@ -63,7 +173,14 @@ class UserService(UserRepository):
 
         data_without_none = data.dict(exclude_none=True)
 
-        return await super()._update(
+        user = await super()._update(
             uuid=uuid,
             **data_without_none,
         )
+        await principal_cache.invalidate_user(user_uuid=uuid)
+        return user
+
+    async def activate(self, uuid: UUID) -> User:
+        user = await super().activate(uuid=uuid)
+        await principal_cache.invalidate_user(user_uuid=uuid)
+        return user
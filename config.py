@@ -1,5 +1,9 @@
+from typing import List
+from typing import Optional
+
 from pydantic import BaseSettings, Field
 from app.db.dsn import generate_dsn_postgres
+from app.db.pool import pool_size_for_worker
 from app.services.utils import generate_app_version
 
 
@@ -9,6 +13,43 @@ class Settings(BaseSettings):
     DB_PORT: int = Field(env="POSTGRES_PORT", default=5432)
     DB_HOST: str = Field(env="POSTGRES_HOST", default="127.0.0.1")
     DB_BASENAME: str = Field(env="POSTGRES_DB", default="test_db")
+    DB_REPLICA_HOSTS: List[str] = Field(env="POSTGRES_REPLICA_HOSTS", default=[])
+    DB_REPLICA_STRATEGY: str = Field(
+        env="POSTGRES_REPLICA_STRATEGY",
+        default="round_robin",
+        regex="^(round_robin|least_connections)$",
+    )
+    DB_REPLICA_HEALTH_INTERVAL: float = Field(
+        env="POSTGRES_REPLICA_HEALTH_INTERVAL", default=5
+    )
+    DB_READ_YOUR_WRITES_SECONDS: float = Field(
+        env="POSTGRES_READ_YOUR_WRITES_SECONDS", default=5
+    )
+
+    DB_POOL_SIZE: Optional[int] = Field(env="POSTGRES_POOL_SIZE", default=None)
+    DB_MAX_OVERFLOW: int = Field(env="POSTGRES_MAX_OVERFLOW", default=10)
+    DB_POOL_TIMEOUT: float = Field(env="POSTGRES_POOL_TIMEOUT", default=30)
+    DB_POOL_PRE_PING: bool = Field(env="POSTGRES_POOL_PRE_PING", default=True)
+    DB_POOL_RECYCLE: int = Field(env="POSTGRES_POOL_RECYCLE", default=1800)
+    # Общий лимит соединений сервиса к одному экземпляру базы на все воркеры
+    DB_CONNECTION_BUDGET: int = Field(env="POSTGRES_CONNECTION_BUDGET", default=100)
+    DB_RESERVED_CONNECTIONS: int = Field(
+        env="POSTGRES_RESERVED_CONNECTIONS", default=0
+    )
+    WORKERS: int = Field(env="WEB_CONCURRENCY", default=1)
+    # Подключение через PgBouncer в режиме pool_mode=transaction
+    DB_POOLER_MODE: bool = Field(env="POSTGRES_POOLER_MODE", default=False)
+    # Пул на процесс перед PgBouncer, 0 - NullPool
+    DB_POOLER_POOL_SIZE: int = Field(env="POSTGRES_POOLER_POOL_SIZE", default=5)
+
+    DB_SLOW_QUERY_MS: float = Field(env="POSTGRES_SLOW_QUERY_MS", default=500)
+    DB_SLOW_QUERY_LOG_INTERVAL: float = Field(
+        env="POSTGRES_SLOW_QUERY_LOG_INTERVAL", default=60
+    )
+    DB_SLOW_QUERY_EXPLAIN: bool = Field(env="POSTGRES_SLOW_QUERY_EXPLAIN", default=False)
+    DB_SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = Field(
+        env="POSTGRES_SLOW_QUERY_EXPLAIN_SAMPLE_RATE", default=0.1
+    )
 
     JWT_SECRET: str = Field(env="JWT_SECRET", default="")
     JWT_ALGORITHM: str = Field(env="JWT_ALGORITHM", default="HS256")
@@ -16,6 +57,42 @@ class Settings(BaseSettings):
         env="JWT_ACCESS_TOKEN_EXPIRE_MINUTES", default=525600
     )
 
+    PASSWORD_HASHING_EXECUTOR: str = Field(
+        env="PASSWORD_HASHING_EXECUTOR", default="thread", regex="^(thread|process)$"
+    )
+    PASSWORD_HASHING_WORKERS: int = Field(env="PASSWORD_HASHING_WORKERS", default=4)
+    PASSWORD_HASHING_QUEUE_SIZE: int = Field(
+        env="PASSWORD_HASHING_QUEUE_SIZE", default=64
+    )
+    PASSWORD_HASHING_TIMEOUT: float = Field(env="PASSWORD_HASHING_TIMEOUT", default=5)
+
+    PENDING_SESSIONS_BACKEND: str = Field(
+        env="PENDING_SESSIONS_BACKEND", default="postgres", regex="^(postgres|redis)$"
+    )
+    PENDING_SESSION_TTL: int = Field(env="PENDING_SESSION_TTL", default=300)
+    PENDING_SESSION_MAX_ATTEMPTS: int = Field(
+        env="PENDING_SESSION_MAX_ATTEMPTS", default=5
+    )
+
+    ACTIVITY_FLUSH_INTERVAL_MS: int = Field(env="ACTIVITY_FLUSH_INTERVAL_MS", default=1000)
+    ACTIVITY_BUFFER_MAX_SIZE: int = Field(env="ACTIVITY_BUFFER_MAX_SIZE", default=50000)
+
+    PRESENCE_ONLINE_TTL: int = Field(env="PRESENCE_ONLINE_TTL", default=60)
+    PRESENCE_RETENTION: int = Field(env="PRESENCE_RETENTION", default=2592000)
+
+    USERS_EXPORT_BATCH_SIZE: int = Field(env="USERS_EXPORT_BATCH_SIZE", default=1000)
+
+    REFERENCE_REFRESH_INTERVAL: float = Field(
+        env="REFERENCE_REFRESH_INTERVAL", default=300
+    )
+    REFERENCE_NOTIFY_CHANNEL: Optional[str] = Field(
+        env="REFERENCE_NOTIFY_CHANNEL", default="reference_data"
+    )
+
+    # Сколько соединений пула открыть при старте, не больше pool_size
+    WARMUP_DB_CONNECTIONS: int = Field(env="WARMUP_DB_CONNECTIONS", default=2)
+    WARMUP_RETRY_INTERVAL: float = Field(env="WARMUP_RETRY_INTERVAL", default=5)
+
     BASE_DOMAIN: str = Field(env="BASE_DOMAIN", default="0.0.0.0")
     PORT: int = Field(env="PORT", default=80)
 
@@ -41,6 +118,36 @@ class Settings(BaseSettings):
             database_name=self.DB_BASENAME,
         )
 
+    @property
+    def pool_size(self) -> int:
+        if self.DB_POOL_SIZE is not None:
+            return self.DB_POOL_SIZE
+        # Бюджет серверных соединений соблюдает PgBouncer
+        if self.DB_POOLER_MODE:
+            return self.DB_POOLER_POOL_SIZE
+        return pool_size_for_worker(
+            connection_budget=self.DB_CONNECTION_BUDGET,
+            workers=self.WORKERS,
+            max_overflow=self.DB_MAX_OVERFLOW,
+            reserved=self.DB_RESERVED_CONNECTIONS,
+        )
+
+    @property
+    def replica_dsns(self) -> List[str]:
+        dsns = []
+        for replica in self.DB_REPLICA_HOSTS:
+            host, _, port = replica.partition(":")
+            dsns.append(
+                generate_dsn_postgres(
+                    user=self.DB_USERNAME,
+                    password=self.DB_PASSWORD,
+                    host=host,
+                    port=int(port or self.DB_PORT),
+                    database_name=self.DB_BASENAME,
+                )
+            )
+        return dsns
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -78,6 +185,46 @@ class RedisSettings(BaseSettings):
         env_file_encoding = "utf-8"
 
 
+class CacheSettings(BaseSettings):
+    PRINCIPAL_LOCAL_SIZE: int = Field(env="PRINCIPAL_CACHE_LOCAL_SIZE", default=10000)
+    PRINCIPAL_LOCAL_TTL: float = Field(env="PRINCIPAL_CACHE_LOCAL_TTL", default=5)
+    PRINCIPAL_TTL: int = Field(env="PRINCIPAL_CACHE_TTL", default=600)
+
+    IPWHOIS_SIZE: int = Field(env="IPWHOIS_CACHE_SIZE", default=50000)
+    IPWHOIS_TTL: float = Field(env="IPWHOIS_CACHE_TTL", default=86400)
+    IPWHOIS_NEGATIVE_TTL: float = Field(env="IPWHOIS_CACHE_NEGATIVE_TTL", default=60)
+    IPWHOIS_SHARED: bool = Field(env="IPWHOIS_CACHE_SHARED", default=False)
+
+    USER_AGENT_SIZE: int = Field(env="USER_AGENT_CACHE_SIZE", default=10000)
+
+    class Config:
+        env_file = ".env"
+        env_file_encoding = "utf-8"
+
+
+class OutboxSettings(BaseSettings):
+    BACKEND: str = Field(
+        env="OUTBOX_BACKEND", default="redis", regex="^(redis|memory)$"
+    )
+    SMS_PROVIDER: str = Field(
+        env="OUTBOX_SMS_PROVIDER", default="smsaero", regex="^(smsaero|fake)$"
+    )
+    CONCURRENCY: int = Field(env="OUTBOX_CONCURRENCY", default=16)
+    BATCH_SIZE: int = Field(env="OUTBOX_BATCH_SIZE", default=50)
+    POLL_INTERVAL: float = Field(env="OUTBOX_POLL_INTERVAL", default=0.5)
+    LEASE_TIMEOUT: float = Field(env="OUTBOX_LEASE_TIMEOUT", default=60)
+    SEND_TIMEOUT: float = Field(env="OUTBOX_SEND_TIMEOUT", default=10)
+    MAX_ATTEMPTS: int = Field(env="OUTBOX_MAX_ATTEMPTS", default=5)
+    BACKOFF_BASE: float = Field(env="OUTBOX_BACKOFF_BASE", default=1)
+    BACKOFF_MAX: float = Field(env="OUTBOX_BACKOFF_MAX", default=60)
+    SMSAERO_RATE_LIMIT: float = Field(env="OUTBOX_SMSAERO_RATE_LIMIT", default=10)
+    DEAD_LETTER_TTL: int = Field(env="OUTBOX_DEAD_LETTER_TTL", default=604800)
+
+    class Config:
+        env_file = ".env"
+        env_file_encoding = "utf-8"
+
+
 class SettingsOpenSensus(Settings):
 
     AUTO_MASK_LOGS: bool = Field(env="AUTO_MASK_LOGS", default=True)
@@ -163,6 +310,10 @@ class OtherServicesSettings(BaseSettings):
     SMSAERO_EMAIL: str = Field(env="SMSAERO_EMAIL")
     SMSAERO_API_KEY: str = Field(env="SMSAERO_APIKEY")
     IPWHOIS_API: str = Field(env="IPWHOIS_API")
+    GEOIP_DATABASE_PATH: Optional[str] = Field(env="GEOIP_DATABASE_PATH", default=None)
+    GEOIP_RELOAD_INTERVAL: float = Field(env="GEOIP_RELOAD_INTERVAL", default=60)
+    # Запрос к IPWhois при входе включается только явно
+    GEOIP_IPWHOIS_FALLBACK: bool = Field(env="GEOIP_IPWHOIS_FALLBACK", default=False)
 
     class Config:
         env_file = ".env"
@@ -184,4 +335,6 @@ class OtherServicesSettingsMarker:
 settings_app = Settings()
 settings_sensus_app = SettingsOpenSensus()
 settings_redis = RedisSettings()
+settings_cache = CacheSettings()
+settings_outbox = OutboxSettings()
 settings_services = OtherServicesSettings()
@@ -8,17 +8,36 @@ from starlette.middleware.trustedhost import TrustedHostMiddleware
 from starlette_exporter import PrometheusMiddleware
 from starlette_exporter import handle_metrics
 
+from app.db.uow import UnitOfWorkMiddleware
+from app.db.uow import current_session
 from app.exceptions.binding import setup_exception_handlers
+from app.health.dependencies import WarmUpMarker
+from app.health.handlers import health_router
+from app.health.warmup import WarmUp
+from app.services.geoip.client import GeoIPClient
+from app.services.ipwhois.cache import CachedIPWhoisClient
 from app.services.ipwhois.client import IPWhoisClient
 from app.services.ipwhois.dependencies import IPWhoisClientMarker
+from app.services.outbox.client import SMSOutbox
+from app.services.outbox.dispatcher import OutboxDispatcher
+from app.services.outbox.providers import FakeSMSProvider
+from app.services.outbox.providers import SMSAeroProvider
+from app.services.outbox.storage import InMemoryOutboxStorage
+from app.services.outbox.storage import RedisOutboxStorage
 from app.services.smsaero.dependencies import SMSAeroDependencyMarker
 from app.utils.logging.middlewares import LoggingMiddleware
 from app.utils.logging.middlewares import OpenCensusFastAPIMiddleware
 from app.v1.binding import own_router_v1
+from app.v1.docs.hanlders import build_openapi
+from app.v1.reference.registry import reference_registry
+from app.v1.security.context import password_hasher
 from app.v1.security.dependencies import UserSessionDependencyMarker
+from app.v1.security.pending import RedisPendingSessionRepository
 from app.v1.security.repo import UserSessionRepository
 from app.v1.security.services import UserSessionService
+from app.v1.users.activity import ActivityBuffer
 from app.v1.users.dependencies import UsersDependencyMarker
+from app.v1.users.presence import PresenceIndex
 from app.v1.users.services import UserService
 from config import BaseSettingsMarker
 from config import HTTPAuthSettings
@@ -27,14 +46,112 @@ from config import OtherServicesSettings
 from config import OtherServicesSettingsMarker
 from config import Settings
 from config import settings_app
+from config import settings_cache
+from config import settings_outbox
 from config import settings_sensus_app
 from config import settings_services
 from misc import async_session
+from misc import cache
+from misc import engine
+from misc import redis_client
+from misc import replica_engines
+from misc import replica_router
 
 dictConfig(settings_sensus_app.log_config)
 logger = logging.getLogger(__name__)
 
 
+outbox_storage = (
+    RedisOutboxStorage(
+        redis=redis_client,
+        queue="sms",
+        dead_letter_ttl=settings_outbox.DEAD_LETTER_TTL,
+    )
+    if settings_outbox.BACKEND == "redis"
+    else InMemoryOutboxStorage()
+)
+
+outbox_dispatcher = OutboxDispatcher(
+    storage=outbox_storage,
+    providers=[
+        SMSAeroProvider(
+            client=SMSAero(
+                email=settings_services.SMSAERO_EMAIL,
+                api_key=settings_services.SMSAERO_API_KEY,
+            )
+        ),
+        FakeSMSProvider(),
+    ],
+    rate_limits={SMSAeroProvider.name: settings_outbox.SMSAERO_RATE_LIMIT},
+    concurrency=settings_outbox.CONCURRENCY,
+    batch_size=settings_outbox.BATCH_SIZE,
+    poll_interval=settings_outbox.POLL_INTERVAL,
+    lease_timeout=settings_outbox.LEASE_TIMEOUT,
+    send_timeout=settings_outbox.SEND_TIMEOUT,
+    max_attempts=settings_outbox.MAX_ATTEMPTS,
+    backoff_base=settings_outbox.BACKOFF_BASE,
+    backoff_max=settings_outbox.BACKOFF_MAX,
+)
+
+
+ipwhois_client = CachedIPWhoisClient(
+    client=IPWhoisClient(api_key=settings_services.IPWHOIS_API),
+    maxsize=settings_cache.IPWHOIS_SIZE,
+    ttl=settings_cache.IPWHOIS_TTL,
+    negative_ttl=settings_cache.IPWHOIS_NEGATIVE_TTL,
+    shared=cache if settings_cache.IPWHOIS_SHARED else None,
+)
+
+geoip_client = GeoIPClient(
+    path=settings_services.GEOIP_DATABASE_PATH,
+    fallback=ipwhois_client if settings_services.GEOIP_IPWHOIS_FALLBACK else None,
+    reload_interval=settings_services.GEOIP_RELOAD_INTERVAL,
+)
+
+
+activity_buffer = ActivityBuffer(
+    engine=engine,
+    flush_interval=settings_app.ACTIVITY_FLUSH_INTERVAL_MS / 1000,
+    max_size=settings_app.ACTIVITY_BUFFER_MAX_SIZE,
+)
+
+presence_index = PresenceIndex(
+    redis=redis_client,
+    online_ttl=settings_app.PRESENCE_ONLINE_TTL,
+    retention=settings_app.PRESENCE_RETENTION,
+)
+
+
+async def get_user_service() -> UserService:
+    return UserService(
+        db_session=current_session(),
+        activity=activity_buffer,
+        presence=presence_index,
+    )
+
+
+async def get_user_session_service() -> UserSessionService:
+    repo = UserSessionRepository(db_session=current_session())
+    pending = None
+    if settings_app.PENDING_SESSIONS_BACKEND == "redis":
+        pending = RedisPendingSessionRepository(
+            cache=cache,
+            repo=repo,
+            ttl=settings_app.PENDING_SESSION_TTL,
+            max_attempts=settings_app.PENDING_SESSION_MAX_ATTEMPTS,
+        )
+
+    return UserSessionService(
+        repo=repo,
+        outbox=SMSOutbox(
+            storage=outbox_storage,
+            provider=settings_outbox.SMS_PROVIDER,
+        ),
+        whois=geoip_client,
+        pending=pending,
+    )
+
+
 def get_application_v1() -> FastAPI:
     application = FastAPI(
         debug=False,
@@ -44,6 +161,7 @@ def get_application_v1() -> FastAPI:
         version="1.2.15",
         root_path="/api/v1",
     )
+    application.add_middleware(UnitOfWorkMiddleware, session_factory=async_session)
     application.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
@@ -68,15 +186,8 @@ def get_application_v1() -> FastAPI:
 
     application.dependency_overrides.update(
         {
-            UsersDependencyMarker: lambda: UserService(db_session=async_session),
-            UserSessionDependencyMarker: lambda: UserSessionService(
-                repo=UserSessionRepository(db_session=async_session),
-                sms_aero=SMSAero(
-                    email=settings_services.SMSAERO_EMAIL,
-                    api_key=settings_services.SMSAERO_API_KEY,
-                ),
-                whois=IPWhoisClient(api_key=settings_services.IPWHOIS_API),
-            ),
+            UsersDependencyMarker: get_user_service,
+            UserSessionDependencyMarker: get_user_session_service,
             HTTPAuthSettingsMarker: lambda: HTTPAuthSettings(),
             BaseSettingsMarker: lambda: Settings(),
             OtherServicesSettingsMarker: lambda: OtherServicesSettings(),
@@ -84,9 +195,7 @@ def get_application_v1() -> FastAPI:
                 email=settings_services.SMSAERO_EMAIL,
                 api_key=settings_services.SMSAERO_API_KEY,
             ),
-            IPWhoisClientMarker: lambda: IPWhoisClient(
-                api_key=settings_services.IPWHOIS_API
-            ),
+            IPWhoisClientMarker: lambda: ipwhois_client,
         }
     )
 
@@ -112,8 +221,36 @@ def get_parent_app() -> FastAPI:
         openapi_tags=tags_metadata,
     )
 
-    application.mount("/api/v1", get_application_v1())
+    application_v1 = get_application_v1()
+    warmup = WarmUp(
+        engines=[engine, *replica_engines],
+        redis=redis_client,
+        cache=cache,
+        reference_registry=reference_registry,
+        password_hasher=password_hasher,
+        openapi=lambda: (
+            build_openapi(app=application_v1, version=settings_app.APP_VERSION),
+            application.openapi(),
+        ),
+        db_connections=settings_app.WARMUP_DB_CONNECTIONS,
+        retry_interval=settings_app.WARMUP_RETRY_INTERVAL,
+    )
+
+    application.mount("/api/v1", application_v1)
     application.add_route("/__metrics", handle_metrics)
+    application.include_router(health_router)
+    application.dependency_overrides[WarmUpMarker] = lambda: warmup
+    application.add_event_handler("startup", replica_router.start)
+    application.add_event_handler("startup", reference_registry.start)
+    application.add_event_handler("startup", outbox_dispatcher.start)
+    application.add_event_handler("startup", activity_buffer.start)
+    application.add_event_handler("startup", warmup.start)
+    application.add_event_handler("shutdown", warmup.stop)
+    application.add_event_handler("shutdown", activity_buffer.stop)
+    application.add_event_handler("shutdown", outbox_dispatcher.stop)
+    application.add_event_handler("shutdown", reference_registry.stop)
+    application.add_event_handler("shutdown", replica_router.stop)
+    application.add_event_handler("shutdown", password_hasher.shutdown)
 
     return application
 
@@ -1,29 +1,54 @@
 import sqlalchemy
 from cashews import Cache
+from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.db.asyncpg_utils import *  # noqa
+from app.db.metrics import instrument_queries
+from app.db.pool import engine_options
+from app.db.pool import instrument_engine
+from app.db.routing import ReplicaRouter
+from app.db.routing import RoutingSession
+from app.db.slow_queries import SlowQueryLog
 from config import settings_app
 from config import settings_redis
+from config import settings_sensus_app
 
 DATABASE_URL = settings_app.dsn
 
-engine = create_async_engine(
-    DATABASE_URL,
-    future=True,
-    echo=False,
-    connect_args={"timeout": 30},
-    pool_size=100,
+ENGINE_OPTIONS = engine_options(
+    pool_size=settings_app.pool_size,
+    max_overflow=settings_app.DB_MAX_OVERFLOW,
+    pool_timeout=settings_app.DB_POOL_TIMEOUT,
+    pool_pre_ping=settings_app.DB_POOL_PRE_PING,
+    pool_recycle=settings_app.DB_POOL_RECYCLE,
+    pooler_mode=settings_app.DB_POOLER_MODE,
 )
 
-async_session = sessionmaker(
-    engine,
-    expire_on_commit=False,
-    class_=AsyncSession,
+slow_query_log = SlowQueryLog(
+    threshold=settings_app.DB_SLOW_QUERY_MS / 1000,
+    interval=settings_app.DB_SLOW_QUERY_LOG_INTERVAL,
+    sensitive_keys=settings_sensus_app.DEFAULT_SENSITIVE_KEY_WORDS,
+    explain=settings_app.DB_SLOW_QUERY_EXPLAIN,
+    explain_sample_rate=settings_app.DB_SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
 )
+
+engine = create_async_engine(DATABASE_URL, **ENGINE_OPTIONS)
+instrument_engine(engine, name="primary")
+instrument_queries(engine, name="primary", slow_query_log=slow_query_log)
+
+replica_engines = []
+for index, dsn in enumerate(settings_app.replica_dsns):
+    replica_engine = create_async_engine(dsn, **ENGINE_OPTIONS)
+    instrument_engine(replica_engine, name=f"replica-{index}")
+    instrument_queries(
+        replica_engine, name=f"replica-{index}", slow_query_log=slow_query_log
+    )
+    replica_engines.append(replica_engine)
+
 autocommit_engine = engine.execution_options(isolation_level="AUTOCOMMIT")
 
 metadata = sqlalchemy.MetaData()
@@ -37,3 +62,22 @@ cache.setup(
     retry_on_timeout=True,
     hash_key=settings_redis.HASH_KEY,
 )
+
+redis_client = Redis.from_url(settings_redis.dsn)
+
+replica_router = ReplicaRouter(
+    primary=engine,
+    replicas=replica_engines,
+    strategy=settings_app.DB_REPLICA_STRATEGY,
+    read_your_writes=settings_app.DB_READ_YOUR_WRITES_SECONDS,
+    health_interval=settings_app.DB_REPLICA_HEALTH_INTERVAL,
+    cache=cache,
+)
+
+async_session = sessionmaker(
+    engine,
+    expire_on_commit=False,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    router=replica_router,
+)